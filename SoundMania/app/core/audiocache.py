@@ -0,0 +1,276 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import partial
+from typing import Literal
+import hashlib
+import json
+import os
+import wave
+
+import pygame
+
+from core.mapmanager import MapInfo
+from core.taskscheduler import TaskScheduler
+
+import logging
+logger = logging.getLogger("AudioCache")
+
+
+_ClipKind = Literal["preview", "full"]
+
+MAX_SOURCE_SIZE = 16 * 1024 * 1024 # largest encoded song decoded in full, in bytes
+
+
+def decode_clip(song_path: str, clip_path: str, start: int = 0, length: int | None = None) -> int:
+    """ Decode a segment of a song to a WAV file in the current mixer format.
+
+        WAV songs already in the mixer format are read from `start` without decoding the rest of the file.
+        The mixer can't seek in nor partially decode other formats, so those are decoded in full, and songs
+        larger than `MAX_SOURCE_SIZE` are refused to bound the memory taken by the decoded samples.
+
+        Args:
+            song_path: path to the encoded song
+            clip_path: path of the WAV file to be written, replaced atomically
+            start: start of the segment in miliseconds
+            length: length of the segment in miliseconds, defaults to the rest of the song
+
+        Returns:
+            size of the written file in bytes
+
+        Raises:
+            `ValueError` when the song is too large to be decoded in full
+    """
+    frequency, size, channels = pygame.mixer.get_init()
+    frame_bytes = abs(size) // 8 * channels
+
+    frames: bytes | memoryview | None = _read_wav_segment(song_path, (frequency, size, channels), start, length)
+    if frames is None:
+        source_size = os.path.getsize(song_path)
+        if source_size > MAX_SOURCE_SIZE:
+            raise ValueError(f"'{song_path}' is too large to be decoded ({source_size // 1024**2}MB)")
+
+        raw = memoryview(pygame.mixer.Sound(song_path).get_raw())
+        begin = min(start * frequency // 1000, len(raw) // frame_bytes) * frame_bytes
+        end = len(raw) if length is None else min(begin + length * frequency // 1000 * frame_bytes, len(raw))
+        frames = raw[begin:end]
+
+    tmp_path = clip_path + ".tmp"
+    with wave.open(tmp_path, "wb") as file:
+        file.setnchannels(channels)
+        file.setsampwidth(abs(size) // 8)
+        file.setframerate(frequency)
+        file.writeframes(frames)
+    os.replace(tmp_path, clip_path)
+
+    return os.path.getsize(clip_path)
+
+
+def _read_wav_segment(song_path: str, mixer_format: tuple[int, int, int], start: int, length: int | None) -> bytes | None:
+    """ Read a segment of a WAV song in the mixer format, or return `None` when the song needs decoding. """
+    frequency, size, channels = mixer_format
+    if not song_path.lower().endswith(".wav") or size != -16: # 8 bit WAV samples are unsigned, unlike the mixer ones
+        return None
+
+    try:
+        with wave.open(song_path, "rb") as file:
+            if (file.getframerate(), file.getsampwidth(), file.getnchannels()) != (frequency, 2, channels):
+                return None
+
+            file.setpos(min(start * frequency // 1000, file.getnframes()))
+            return file.readframes(file.getnframes() if length is None else length * frequency // 1000)
+    except (wave.Error, EOFError):
+        return None
+
+
+class AudioCache:
+    """ Class responsible for maintaining an on-disk cache of decoded songs.
+
+        Both short preview clips and fully decoded songs are stored as WAV files, which the mixer
+        streams without any decoding cost. Clips are decoded in the background by the task scheduler,
+        and the least recently used ones are evicted once the cache grows over its size budget.
+
+        Decoding a song can take tens of MB of memory, so at most `MAX_DECODES_IN_FLIGHT` clips are decoded
+        at once, and the other prefetched clips wait in a queue, which `cancel_prefetches()` clears.
+    """
+    DIRECTORY = os.path.join("SoundMania", "locals", "cache", "audio")
+    INDEX_FILE_NAME = "index.json"
+    INDEX_VERSION = 1
+    PREVIEW_LENGTH = 15000 # length of a preview clip in ms
+    MAX_DECODES_IN_FLIGHT = 1
+
+    def __init__(self, task_scheduler: TaskScheduler, budget: int, directory: str = DIRECTORY):
+        """ Make a new audio cache.
+
+            Args:
+                task_scheduler: scheduler running the decoding tasks
+                budget: maximum total size of the cached clips in bytes
+                directory: directory the clips and the cache index are stored in
+        """
+        self.task_scheduler = task_scheduler
+        self.budget = budget
+        self.directory = directory
+
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, self.INDEX_FILE_NAME)
+        self._entries: OrderedDict[str, int] = self._load_index() # clip file name -> size, least recently used first
+        self._remove_orphans()
+        self._building: dict[str, Future] = {}
+        self._queued: OrderedDict[str, tuple] = OrderedDict() # clip file name -> decoding arguments, waiting for a free decode
+        self._keys: dict[tuple[str, int, _ClipKind], str | None] = {} # clip file names, computed once per session
+        self._failed: set[str] = set()
+        self._dirty = False
+
+
+    @property
+    def size(self) -> int:
+        return sum(self._entries.values())
+
+
+    def get(self, map_info: MapInfo, kind: _ClipKind) -> str | None:
+        """ Return the path to a cached clip of a map song, or `None` when it's not cached yet. """
+        key = self._key(map_info, kind)
+        if key is None or key not in self._entries:
+            return None
+
+        self._entries.move_to_end(key)
+        self._dirty = True
+        return os.path.join(self.directory, key)
+
+
+    def get_preview(self, map_info: MapInfo) -> tuple[str, int]:
+        """ Return the best available source of a song preview.
+
+            Returns:
+                a path to the audio file to be played and the position in miliseconds to start playing it from
+        """
+        if path := self.get(map_info, "preview"):
+            return path, 0
+        if path := self.get(map_info, "full"):
+            return path, map_info.preview_offset
+
+        self.prefetch(map_info, "preview")
+        return map_info.song_path, map_info.preview_offset
+
+
+    def prefetch(self, map_info: MapInfo, *kinds: _ClipKind) -> None:
+        """ Queue decoding of the given clip kinds of a map song, unless they're cached, queued or being built already. """
+        if not pygame.mixer.get_init():
+            return
+
+        for kind in kinds:
+            key = self._key(map_info, kind)
+            if key is None or key in self._entries or key in self._building or key in self._queued or key in self._failed:
+                continue
+
+            start, length = (map_info.preview_offset, self.PREVIEW_LENGTH) if kind == "preview" else (0, None)
+            self._queued[key] = (map_info.song_path, os.path.join(self.directory, key), start, length)
+
+        self._start_decodes()
+
+
+    def cancel_prefetches(self) -> None:
+        """ Drop all queued clips. Clips already being decoded are still added to the cache. """
+        self._queued.clear()
+
+
+    def flush(self) -> None:
+        """ Save the cache index, if it changed since it was last saved. """
+        if self._dirty:
+            self._save_index()
+
+
+    def _add(self, key: str, size: int) -> None:
+        self._entries[key] = size
+        self._entries.move_to_end(key)
+        self._evict()
+        self._save_index()
+
+
+    def _start_decodes(self) -> None:
+        while self._queued and len(self._building) < self.MAX_DECODES_IN_FLIGHT:
+            key, args = self._queued.popitem(last=False)
+            self._building[key] = future = self.task_scheduler.submit(decode_clip, *args, callback=partial(self._add, key))
+            future.add_done_callback(partial(self._on_done, key))
+
+
+    def _on_done(self, key: str, future: Future) -> None:
+        del self._building[key]
+        if not future.cancelled() and future.exception() is not None:
+            self._failed.add(key) # don't retry songs the mixer can't decode
+        self._start_decodes()
+
+
+    def _evict(self) -> None:
+        total = self.size
+        while total > self.budget and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            total -= size
+            self._remove_clip(key)
+            logger.debug(f"Evicted '{key}' from the audio cache")
+
+
+    def _remove_clip(self, name: str) -> None:
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError as e: # the clip might still be streamed by the mixer
+            logger.warning(f"Could not remove audio cache clip '{name}': {e}")
+
+
+    def _key(self, map_info: MapInfo, kind: _ClipKind) -> str | None:
+        """ Return the clip file name, changing whenever the song, the clip parameters or the mixer format change.
+
+            Names are computed once per song, clip kind and preview offset, so repeated lookups never touch the disk.
+        """
+        memo_key = (map_info.song_path, map_info.preview_offset, kind)
+        try:
+            return self._keys[memo_key]
+        except KeyError:
+            key = self._keys[memo_key] = self._make_key(map_info, kind)
+            return key
+
+
+    def _make_key(self, map_info: MapInfo, kind: _ClipKind) -> str | None:
+        try:
+            song_stat = os.stat(map_info.song_path)
+        except FileNotFoundError:
+            return None
+
+        digest = hashlib.sha1(os.path.abspath(map_info.song_path).encode())
+        digest.update(f"{song_stat.st_size}:{song_stat.st_mtime_ns}:{pygame.mixer.get_init()}".encode())
+        if kind == "preview":
+            digest.update(f"{map_info.preview_offset}:{self.PREVIEW_LENGTH}".encode())
+
+        return f"{digest.hexdigest()}.{kind}.wav"
+
+
+    def _load_index(self) -> OrderedDict[str, int]:
+        try:
+            with open(self.index_path, "r") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return OrderedDict()
+        except ValueError:
+            logger.warning(f"Audio cache index '{self.index_path}' is corrupted and will be rebuilt")
+            return OrderedDict()
+
+        if data.get("version") != self.INDEX_VERSION:
+            return OrderedDict()
+
+        return OrderedDict((key, size) for key, size in data["clips"].items() if os.path.isfile(os.path.join(self.directory, key)))
+
+
+    def _remove_orphans(self) -> None:
+        """ Remove clips missing from the index, left behind by an interrupted session. """
+        for name in os.listdir(self.directory):
+            if name.endswith((".wav", ".tmp")) and name not in self._entries:
+                self._remove_clip(name)
+
+
+    def _save_index(self) -> None:
+        data = {"version": self.INDEX_VERSION, "clips": self._entries} # saved in the least recently used first order
+
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
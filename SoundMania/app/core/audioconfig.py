@@ -0,0 +1,182 @@
+from dataclasses import dataclass, field
+from math import sin, pi
+from statistics import mean, pstdev
+from time import perf_counter, sleep
+import array
+import os
+import sys
+import tempfile
+import wave
+
+import pygame
+
+from core.configio import ConfigIO
+
+import logging
+logger = logging.getLogger("AudioConfig")
+
+
+@dataclass
+class AudioConfig:
+    """ Mixer initialisation parameters.
+
+        The mixer adds roughly one buffer of latency to every sound played, so cabinets should use the smallest
+        buffer that still plays without underruns. Use `tools/audioprobe.py` to find it.
+    """
+    frequency: int = 44100
+    size: int = -16        # sample size in bits, negative values are signed samples
+    channels: int = 2
+    buffer: int = 256      # number of sample frames per mixer buffer, a power of two
+    num_channels: int = 16 # number of sound effects that can be played at once
+
+    @property
+    def buffer_latency(self) -> float:
+        """ Duration of a single mixer buffer in miliseconds. """
+        return 1000 * self.buffer / self.frequency
+
+
+    @classmethod
+    def from_config(cls, config: ConfigIO) -> "AudioConfig":
+        """ Read the audio configuration from the [AUDIO] section of 'conf.ini', defaulting missing or invalid values. """
+        defaults = cls()
+        values = {name: config.get_audio_setting(name, getattr(defaults, name)) for name in cls.__dataclass_fields__}
+        audio_config = cls(**values)
+
+        if audio_config.buffer <= 0 or audio_config.buffer & (audio_config.buffer - 1):
+            logger.warning(f"Mixer buffer size {audio_config.buffer} is not a power of two. Defaulting to {defaults.buffer}")
+            audio_config.buffer = defaults.buffer
+
+        return audio_config
+
+
+    def save(self, config: ConfigIO) -> None:
+        """ Save the audio configuration to the [AUDIO] section of 'conf.ini'. """
+        config.set_audio_settings(**{name: getattr(self, name) for name in self.__dataclass_fields__})
+
+
+    def init(self) -> None:
+        """ (Re)initialise just the mixer with this configuration. This is the only place the mixer gets configured. """
+        pygame.mixer.quit()
+        try:
+            pygame.mixer.init(self.frequency, self.size, self.channels, self.buffer)
+        except pygame.error as e:
+            logger.error(f"Could not initialise the mixer: {e}")
+
+        if not pygame.mixer.get_init():
+            logger.error("Mixer failed to initialise, audio is disabled")
+            return
+
+        pygame.mixer.set_num_channels(self.num_channels)
+
+        frequency, size, channels = pygame.mixer.get_init()
+        if (frequency, size, channels) != (self.frequency, self.size, self.channels):
+            logger.warning(f"Audio device opened with {frequency}Hz, {size}bit, {channels}ch instead of the configured {self.frequency}Hz, {self.size}bit, {self.channels}ch")
+        logger.info(f"Mixer initialised with a {self.buffer} frame buffer ({self.buffer_latency:.1f}ms)")
+
+
+@dataclass
+class AudioProbeResult:
+    """ Result of probing the mixer with a given configuration. All times are given in miliseconds. """
+    config: AudioConfig
+    duration: float
+    drift: float        # how much the audio position fell behind the wall clock over the whole probe
+    jitter: float       # standard deviation of the audio position error
+    corrections: list[float] = field(default_factory=list, repr=False) # backward jumps of the audio position
+
+    @property
+    def underruns(self) -> int:
+        """ Number of mixer callbacks late by more than a buffer, heard as clicks or dropouts. """
+        return sum(correction > self.config.buffer_latency for correction in self.corrections)
+
+
+    @property
+    def stable(self) -> bool:
+        return self.underruns == 0 and abs(self.drift) < self.config.buffer_latency
+
+
+class AudioProbe:
+    """ Class responsible for measuring how reliably the mixer keeps up with a given configuration.
+
+        Between two mixer callbacks `pygame.mixer.music.get_pos()` is extrapolated with the system timer, and
+        every callback snaps it back to the amount of audio actually mixed. A late callback therefore shows up
+        as the position jumping backwards, and a starved mixer as the position drifting behind the wall clock.
+    """
+    SAMPLE_INTERVAL = 0.001 # seconds between two position samples
+    TONE_FREQUENCY = 440
+    TONE_VOLUME = 0.05
+
+    def __init__(self, duration: int = 3000, frame_load: float = 0):
+        """ Make a new audio probe.
+
+            Args:
+                duration: time in miliseconds to probe each configuration for
+                frame_load: time in miliseconds to busy-wait between position samples, simulating a loaded main loop
+        """
+        self.duration = duration
+        self.frame_load = frame_load
+
+
+    def run(self, config: AudioConfig) -> AudioProbeResult:
+        """ Reinitialise the mixer with `config` and probe it. The mixer is left initialised with `config`. """
+        config.init()
+        if not pygame.mixer.get_init():
+            raise RuntimeError("mixer is not initialised")
+
+        fd, song_path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            self._write_tone(song_path, self.duration + 1000)
+            pygame.mixer.music.load(song_path)
+            return self._probe(config)
+        finally:
+            pygame.mixer.music.stop()
+            pygame.mixer.music.unload()
+            os.remove(song_path)
+
+
+    def _probe(self, config: AudioConfig) -> AudioProbeResult:
+        pygame.mixer.music.play()
+        while pygame.mixer.music.get_pos() <= 0: # wait for the first callback
+            sleep(self.SAMPLE_INTERVAL)
+
+        start_time, start_position = perf_counter(), pygame.mixer.music.get_pos()
+        last_position = start_position
+        errors: list[float] = []
+        corrections: list[float] = []
+
+        elapsed = 0.0
+        while elapsed < self.duration:
+            sleep(self.SAMPLE_INTERVAL)
+            if self.frame_load:
+                load_end = perf_counter() + self.frame_load / 1000
+                while perf_counter() < load_end:
+                    pass
+
+            position = pygame.mixer.music.get_pos()
+            elapsed = (perf_counter() - start_time) * 1000
+            errors.append(elapsed - (position - start_position))
+            if position < last_position:
+                corrections.append(last_position - position)
+            last_position = position
+
+        window = max(len(errors) // 10, 1)
+        drift = mean(errors[-window:]) - mean(errors[:window])
+        return AudioProbeResult(config, elapsed, drift, pstdev(errors), corrections)
+
+
+    def _write_tone(self, path: str, duration: int) -> None:
+        frequency, size, channels = pygame.mixer.get_init()
+        frames = frequency * duration // 1000
+        amplitude = self.TONE_VOLUME * 32767
+
+        samples = array.array("h")
+        for i in range(frames):
+            samples.extend([int(amplitude * sin(2 * pi * self.TONE_FREQUENCY * i / frequency))] * channels)
+        if sys.byteorder == "big":
+            samples.byteswap() # WAV samples are little-endian
+
+        with wave.open(path, "wb") as file:
+            file.setnchannels(channels)
+            file.setsampwidth(2)
+            file.setframerate(frequency)
+            file.writeframes(samples.tobytes())
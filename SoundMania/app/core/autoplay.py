@@ -0,0 +1,113 @@
+from dataclasses import dataclass, field
+from time import perf_counter_ns
+import random
+
+from core.chart import ChartData
+from core.gameplay import GameplaySession
+from core.judgement import Judgement
+from core.songclock import SongClock
+
+
+@dataclass
+class AutoplayReport:
+    """ Result of a headless autoplay run. All durations are given in miliseconds. """
+    notes: int
+    simulated_time: float
+    wall_time: float
+    updates: int
+    update_time_mean: float
+    update_time_max: float
+    counts: dict[Judgement, int] = field(default_factory=dict)
+
+    @property
+    def speedup(self) -> float:
+        """ Ratio of the simulated time to the wall time. """
+        return self.simulated_time / self.wall_time if self.wall_time else float("inf")
+
+
+class AutoplaySimulator:
+    """ Class responsible for playing a chart without a window, audio device nor a real-time clock.
+
+        The simulator drives a `GameplaySession` from a simulated clock, advanced frame by frame as fast as
+        the CPU allows. The audio position is simulated with the granularity of an audio buffer, so the song
+        clock goes through the same drift correction as in the game. The autoplay player presses every note,
+        optionally with a gaussian timing jitter.
+    """
+    FRAME_TIME = 1000 / 240
+    AUDIO_BUFFER_TIME = 1024 / 44100 * 1000
+    LEAD_OUT = 1000 # time simulated after the last note
+
+    def __init__(self, chart: ChartData, frame_time: float = FRAME_TIME, jitter: float = 0, seed: int = 0):
+        self.chart = chart
+        self.frame_time = frame_time
+        self.jitter = jitter
+
+        self._rng = random.Random(seed)
+        self._now = 0 # simulated time in ns
+        self.clock = SongClock(self._audio_position, time_source=self._time)
+        self.session = GameplaySession(chart, self.clock)
+
+
+    def run(self) -> AutoplayReport:
+        """ Play the whole chart and report the results. """
+        inputs = self._generate_inputs()
+        end_time = max((max(ends) for ends in self.chart.hold_ends if len(ends)), default=0) + self.LEAD_OUT
+        frame_ns = int(self.frame_time * 1_000_000)
+
+        updates = 0
+        update_total = 0
+        update_max = 0
+        next_input = 0
+
+        start = perf_counter_ns()
+        self.clock.start()
+        while self._now < end_time * 1_000_000 or not self.session.finished:
+            frame_end = self._now + frame_ns
+            while next_input < len(inputs) and inputs[next_input][0] * 1_000_000 < frame_end:
+                time, lane, pressed = inputs[next_input]
+                self._now = max(self._now, int(time * 1_000_000))
+                self.session.lane_input(lane, pressed)
+                next_input += 1
+            self._now = frame_end
+
+            update_start = perf_counter_ns()
+            self.clock.update()
+            self.session.update()
+            update_time = perf_counter_ns() - update_start
+
+            updates += 1
+            update_total += update_time
+            update_max = max(update_max, update_time)
+
+        wall_time = (perf_counter_ns() - start) / 1_000_000
+        return AutoplayReport(
+            notes=self.chart.note_count,
+            simulated_time=self._now / 1_000_000,
+            wall_time=wall_time,
+            updates=updates,
+            update_time_mean=update_total / updates / 1_000_000 if updates else 0,
+            update_time_max=update_max / 1_000_000,
+            counts=dict(self.session.counts)
+        )
+
+
+    def _generate_inputs(self) -> list[tuple[float, int, bool]]:
+        inputs = []
+        for lane, (times, ends) in enumerate(zip(self.chart.lanes, self.chart.hold_ends)):
+            for start, end in zip(times, ends):
+                press = start + (self._rng.gauss(0, self.jitter) if self.jitter else 0)
+                inputs.append((press, lane, True))
+                inputs.append((max(end, press) + 1 if end > start else press + 30, lane, False))
+
+        inputs.sort()
+        return inputs
+
+
+    def _time(self) -> int:
+        return self._now
+
+
+    def _audio_position(self) -> float:
+        position = self._now / 1_000_000
+        return position - position % self.AUDIO_BUFFER_TIME
+
@@ -0,0 +1,72 @@
+from bisect import bisect_left
+from dataclasses import dataclass
+from statistics import median
+from typing import Sequence
+
+
+@dataclass
+class OffsetEstimate:
+    """ Robust estimate of a latency offset. All values are given in miliseconds. """
+    offset: float   # median of the inlier offsets
+    mad: float      # median absolute deviation of all offsets
+    variance: float # variance of the inlier offsets
+    samples: int
+    rejected: int   # number of outliers left out of the estimate
+
+
+class OffsetCalibrator:
+    """ Class responsible for estimating a latency offset from taps made along a series of beats.
+
+        Each tap is paired with its nearest beat. The estimate is the median of the tap offsets, with
+        offsets further than `OUTLIER_MADS` scaled MADs from the median rejected as outliers.
+    """
+    OUTLIER_MADS = 3
+    MAD_SCALE = 1.4826 # makes MAD a consistent estimator of the standard deviation of normally distributed data
+
+    def __init__(self):
+        self.beats: list[float] = []
+        self.taps: list[float] = []
+
+
+    def add_beat(self, time: float) -> None:
+        self.beats.append(time)
+
+
+    def add_tap(self, time: float) -> None:
+        self.taps.append(time)
+
+
+    def offsets(self) -> list[float]:
+        """ Return the offsets of every tap from its nearest beat. """
+        if not self.beats:
+            return []
+
+        offsets = []
+        for tap in self.taps:
+            i = bisect_left(self.beats, tap)
+            nearest = min(self.beats[max(i-1, 0):i+1], key=lambda beat: abs(tap - beat))
+            offsets.append(tap - nearest)
+
+        return offsets
+
+
+    def estimate(self) -> OffsetEstimate | None:
+        """ Return the robust offset estimate, or `None` when no tap was made. """
+        return self.estimate_offsets(self.offsets())
+
+
+    @classmethod
+    def estimate_offsets(cls, offsets: Sequence[float]) -> OffsetEstimate | None:
+        if not offsets:
+            return None
+
+        center = median(offsets)
+        mad = median(abs(offset - center) for offset in offsets)
+
+        limit = cls.OUTLIER_MADS * cls.MAD_SCALE * mad
+        inliers = [offset for offset in offsets if abs(offset - center) <= limit] if mad else list(offsets)
+        offset = median(inliers)
+        variance = sum((x - offset) ** 2 for x in inliers) / (len(inliers) - 1) if len(inliers) > 1 else 0
+
+        return OffsetEstimate(offset, mad, variance, len(offsets), len(offsets) - len(inliers))
+
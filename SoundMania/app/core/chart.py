@@ -0,0 +1,278 @@
+from __future__ import annotations
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field
+import hashlib
+import mmap
+import os
+import struct
+
+import logging
+logger = logging.getLogger("ChartCompiler")
+
+
+class ChartSyntaxError(ValueError):
+    pass
+
+
+@dataclass
+class ChartData:
+    """ Runtime form of a chart. All timestamps are given in miliseconds.
+
+        Timing segments are stored as parallel arrays of the segment start beat, start timestamp and the
+        duration of a single beat. Notes are stored per lane, as sorted start timestamps and parallel end
+        timestamps, equal to the start for tap notes.
+    """
+    segment_beats: array | memoryview[float]
+    segment_times: array | memoryview[float]
+    segment_beat_lengths: array | memoryview[float]
+    lanes: list[array | memoryview[float]] = field(default_factory=list)
+    hold_ends: list[array | memoryview[float]] = field(default_factory=list)
+
+    @property
+    def lane_count(self) -> int:
+        return len(self.lanes)
+
+
+    @property
+    def note_count(self) -> int:
+        return sum(len(times) for times in self.lanes)
+
+
+    def beat_to_ms(self, beat: float) -> float:
+        """ Convert a beat into a timestamp, using the precomputed timing segments. """
+        i = max(bisect_right(self.segment_beats, beat) - 1, 0)
+        return self.segment_times[i] + (beat - self.segment_beats[i]) * self.segment_beat_lengths[i]
+
+
+class CompiledChart(ChartData):
+    """ ChartData backed by a memory-mapped compiled chart file. The arrays are views into the mapping. """
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header = ChartCompiler.read_header(self._mmap)
+        if header is None:
+            self._mmap.close()
+            raise ValueError(f"'{path}' is not a valid compiled chart")
+
+        _, segment_count, note_counts = header
+        offset = ChartCompiler.data_offset(len(note_counts))
+        if len(self._mmap) != offset + 8 * (3*segment_count + 2*sum(note_counts)):
+            self._mmap.close()
+            raise ValueError(f"compiled chart '{path}' is truncated")
+
+        buffer = memoryview(self._mmap)
+
+        def take(count: int) -> memoryview[float]:
+            nonlocal offset
+            view = buffer[offset:offset + count*8].cast('d')
+            offset += count*8
+            return view
+
+        super().__init__(take(segment_count), take(segment_count), take(segment_count))
+        self.lanes = [take(count) for count in note_counts]
+        self.hold_ends = [take(count) for count in note_counts]
+
+
+    def close(self) -> None:
+        """ Release the array views and unmap the compiled file. """
+        for view in (self.segment_beats, self.segment_times, self.segment_beat_lengths, *self.lanes, *self.hold_ends):
+            if isinstance(view, memoryview):
+                view.release()
+        self.lanes, self.hold_ends = [], []
+        self._mmap.close()
+
+
+class ChartCompiler:
+    """ Class responsible for compiling human-editable chart sources into their runtime form.
+
+        Chart source format, with `#` starting a comment:
+
+            lanes 4
+            offset <ms>              time of the beat 0
+            bpm <beat> <bpm>         tempo change starting at a given beat
+            note <beat> <lane>       tap note
+            hold <beat> <lane> <end beat>
+
+        Compiled charts are cached next to the source, under a file name made of the source hash and `VERSION`.
+        A changed source is compiled to a new file instead of replacing the old one, which might still be
+        memory-mapped, and so locked on Windows. Stale compiled files are removed once they're no longer mapped.
+    """
+    VERSION = 1
+    SOURCE_FILE_NAME = "chart"
+    COMPILED_FILE_PREFIX = "chart."
+    COMPILED_FILE_EXTENSION = ".smc"
+
+    _MAGIC = b"SMC\x00"
+    _HEADER = struct.Struct("<4sHH20sI") # magic, compiler version, lane count, source sha1, timing segment count
+
+    @classmethod
+    def load(cls, map_path: str) -> CompiledChart:
+        """ Return the compiled chart of a map, compiling its source first if the cached chart is missing or stale.
+
+            Raises:
+                `FileNotFoundError` when the map has no chart source
+                `ChartSyntaxError` when the chart source is invalid
+        """
+        source_path = os.path.join(map_path, cls.SOURCE_FILE_NAME)
+        with open(source_path, "rb") as file:
+            source = file.read()
+        digest = hashlib.sha1(source).digest()
+        compiled_path = os.path.join(map_path, cls.compiled_file_name(digest))
+
+        if cls._read_cached_digest(compiled_path) != digest:
+            logger.info(f"Compiling chart of '{map_path}'")
+            chart = cls.compile_source(source.decode("utf-8"))
+            cls.write(compiled_path, chart, digest)
+            cls._remove_stale(map_path, compiled_path)
+
+        return CompiledChart(compiled_path)
+
+
+    @classmethod
+    def compiled_file_name(cls, digest: bytes) -> str:
+        """ Return the name of the compiled chart file of a chart source with a given sha1 digest. """
+        return f"{cls.COMPILED_FILE_PREFIX}v{cls.VERSION}.{digest.hex()[:16]}{cls.COMPILED_FILE_EXTENSION}"
+
+
+    @classmethod
+    def compile_source(cls, source: str) -> ChartData:
+        """ Parse a chart source into ChartData. """
+        lane_count = 4
+        offset = 0.0
+        tempos: dict[float, float] = {}
+        notes: list[tuple[float, int, float]] = []
+
+        for line_no, line in enumerate(source.splitlines(), 1):
+            tokens = line.split("#", 1)[0].split()
+            if not tokens:
+                continue
+
+            try:
+                match tokens:
+                    case ["lanes", count_text]:
+                        lane_count = int(count_text)
+                    case ["offset", ms_text]:
+                        offset = float(ms_text)
+                    case ["bpm", beat_text, bpm_text]:
+                        tempos[float(beat_text)] = float(bpm_text)
+                    case ["note", beat_text, lane_text]:
+                        notes.append((float(beat_text), int(lane_text), float(beat_text)))
+                    case ["hold", beat_text, lane_text, end_text]:
+                        notes.append((float(beat_text), int(lane_text), float(end_text)))
+                    case _:
+                        raise ChartSyntaxError(f"unknown statement '{line.strip()}'")
+            except ValueError as e:
+                raise ChartSyntaxError(f"line {line_no}: {e}") from None
+
+        if not tempos:
+            raise ChartSyntaxError("chart doesn't define any bpm")
+        if any(bpm <= 0 for bpm in tempos.values()):
+            raise ChartSyntaxError("bpm must be greater than 0")
+        if any(beat < 0 for beat in tempos):
+            raise ChartSyntaxError("bpm changes cannot start before beat 0")
+
+        beats = sorted(tempos)
+        if beats[0] > 0: # the first tempo extends back to the beat 0
+            beats.insert(0, 0.0)
+            tempos[0.0] = tempos[beats[1]]
+
+        beat_lengths = array('d', (60000 / tempos[b] for b in beats))
+        segment_times = array('d')
+        time = offset
+        for i, beat in enumerate(beats):
+            if i:
+                time += (beat - beats[i-1]) * beat_lengths[i-1]
+            segment_times.append(time)
+
+        chart = ChartData(array('d', beats), segment_times, beat_lengths)
+
+        per_lane: list[list[tuple[float, float]]] = [[] for _ in range(lane_count)]
+        for beat, lane, end in notes:
+            if not 0 <= lane < lane_count:
+                raise ChartSyntaxError(f"note lane {lane} out of range")
+            if end < beat:
+                raise ChartSyntaxError(f"hold at beat {beat} ends before it starts")
+            per_lane[lane].append((chart.beat_to_ms(beat), chart.beat_to_ms(end)))
+
+        for lane_notes in per_lane:
+            lane_notes.sort()
+            chart.lanes.append(array('d', (start for start, _ in lane_notes)))
+            chart.hold_ends.append(array('d', (end for _, end in lane_notes)))
+
+        return chart
+
+
+    @classmethod
+    def write(cls, path: str, chart: ChartData, digest: bytes) -> None:
+        """ Write a chart to a compiled chart file. The file is replaced atomically.
+
+            A file which can't be replaced, as it's mapped by another chart compiled from the same source, is kept.
+        """
+        header = cls._HEADER.pack(cls._MAGIC, cls.VERSION, chart.lane_count, digest, len(chart.segment_beats))
+        counts = struct.pack(f"<{chart.lane_count}I", *(len(times) for times in chart.lanes))
+        padding = bytes(cls.data_offset(chart.lane_count) - len(header) - len(counts))
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(header + counts + padding)
+            for values in (chart.segment_beats, chart.segment_times, chart.segment_beat_lengths, *chart.lanes, *chart.hold_ends):
+                file.write(array('d', values).tobytes())
+
+        try:
+            os.replace(tmp_path, path)
+        except PermissionError:
+            os.remove(tmp_path)
+            if cls._read_cached_digest(path) != digest:
+                raise
+
+
+    @classmethod
+    def read_header(cls, buffer: bytes | mmap.mmap) -> tuple[bytes, int, tuple[int, ...]] | None:
+        """ Parse a compiled chart header.
+
+            Returns:
+                tuple of the source digest, timing segment count and per-lane note counts, or `None`
+                when the header is invalid or was written by a different compiler version
+        """
+        if len(buffer) < cls._HEADER.size:
+            return None
+
+        magic, version, lane_count, digest, segment_count = cls._HEADER.unpack_from(buffer)
+        if magic != cls._MAGIC or version != cls.VERSION or len(buffer) < cls.data_offset(lane_count):
+            return None
+
+        note_counts = struct.unpack_from(f"<{lane_count}I", buffer, cls._HEADER.size)
+        return digest, segment_count, note_counts
+
+
+    @classmethod
+    def data_offset(cls, lane_count: int) -> int:
+        """ Return the offset of the array data, aligned to 8 bytes. """
+        size = cls._HEADER.size + lane_count*4
+        return (size + 7) // 8 * 8
+
+
+    @classmethod
+    def _remove_stale(cls, map_path: str, compiled_path: str) -> None:
+        """ Remove the compiled charts of the previous chart sources, skipping the ones still memory-mapped. """
+        for name in os.listdir(map_path):
+            path = os.path.join(map_path, name)
+            if name.startswith(cls.COMPILED_FILE_PREFIX) and name.endswith(cls.COMPILED_FILE_EXTENSION) and path != compiled_path:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.debug(f"Could not remove a stale compiled chart '{path}': {e}")
+
+
+    @classmethod
+    def _read_cached_digest(cls, path: str) -> bytes | None:
+        try:
+            with open(path, "rb") as file:
+                header = cls.read_header(file.read(cls._HEADER.size + 4*256))
+        except FileNotFoundError:
+            return None
+
+        return header[0] if header else None
+
@@ -1,4 +1,5 @@
 from functools import cached_property
+from typing import Literal
 import configparser
 
 import logging
@@ -9,25 +10,87 @@ class ConfigIO:
     """ Class responsible for managing user's local settings. """
     CONFIG_PATH = "SoundMania\\locals\\conf.ini"
     DEFAULTS = {
-        "map_dir": "SoundMania\\locals\\maps"
+        "map_dir": "SoundMania\\locals\\maps",
+        "preview_delay": "250",
+        "audio_device": "default",
+        "audio_cache_budget": "512",
+        "map_ordering": "title",
+        "profile_frames": "300",
+        "profile_on_start": "false",
     }
     
+    def __init__(self):
+        self._config = configparser.ConfigParser()
+        self._config.read(self.CONFIG_PATH)
+        self._pending: dict[str, str] = {}
+        
+        
     def settings_get(self, name: str) -> str:
         """ Helper method for extracting user's local settings. """
         return self[name]
     
     
-    def settings_set(self, **mapping: dict[str, str]) -> None:
-        """ Helper method for overriding user's local settings. """
-        pass
+    def settings_set(self, **mapping: str) -> None:
+        """ Helper method for overriding user's local settings. 
+        
+            Overridden settings are kept pending until `settings_apply()` is called.
+        """
+        for name, value in mapping.items():
+            self._pending[name] = str(value)
     
     
     def settings_apply(self) -> None:
-        pass
+        """ Apply all pending settings and save them to 'conf.ini'. """
+        if not self._config.has_section("COMMON"):
+            self._config.add_section("COMMON")
+            
+        for name, value in self._pending.items():
+            self._config["COMMON"][name] = value
+            
+        self._pending.clear()
+        self._save()
     
     
     def settings_discard(self) -> None:
-        pass
+        """ Discard all pending settings. """
+        self._pending.clear()
+        
+        
+    def get_calibration_offset(self, kind: Literal["audio", "input"], device: str) -> float:
+        """ Return the calibrated latency offset of an audio output or input device in miliseconds. """
+        try:
+            return self._config.getfloat("CALIBRATION", f"{kind}_offset.{device}", fallback=0.0)
+        except ValueError:
+            logger.warning(f"Invalid {kind} offset of device '{device}' in 'conf.ini'. Defaulting to 0")
+            return 0.0
+        
+        
+    def set_calibration_offset(self, kind: Literal["audio", "input"], device: str, value: float) -> None:
+        """ Store the calibrated latency offset of an audio output or input device and save it to 'conf.ini'. """
+        if not self._config.has_section("CALIBRATION"):
+            self._config.add_section("CALIBRATION")
+            
+        self._config["CALIBRATION"][f"{kind}_offset.{device}"] = f"{value:.2f}"
+        self._save()
+        
+        
+    def get_audio_setting(self, name: str, default: int) -> int:
+        """ Return an integer mixer setting from the [AUDIO] section of 'conf.ini'. """
+        try:
+            return self._config.getint("AUDIO", name, fallback=default)
+        except ValueError:
+            logger.warning(f"Invalid audio setting '{name}' in 'conf.ini'. Defaulting to {default}")
+            return default
+        
+        
+    def set_audio_settings(self, **mapping: int) -> None:
+        """ Store mixer settings in the [AUDIO] section and save them to 'conf.ini'. """
+        if not self._config.has_section("AUDIO"):
+            self._config.add_section("AUDIO")
+            
+        for name, value in mapping.items():
+            self._config["AUDIO"][name] = str(value)
+        self._save()
     
         
     @classmethod
@@ -43,9 +106,50 @@ class ConfigIO:
             return default
         
     
+    def get_song_preview_delay(self) -> int:
+        """ Return the time in miliseconds a map selection has to settle for, before its song preview is played. """
+        try:
+            return int(self._config["COMMON"]["preview_delay"])
+        except (KeyError, ValueError):
+            default = self.DEFAULTS["preview_delay"]
+            logger.info(f"Could not obtain song preview delay from 'conf.ini'. Defaulting to '{default}'")
+            return int(default)
+        
+    
+    def get_audio_cache_budget(self) -> int:
+        """ Return the maximum size of the decoded audio cache in bytes. The budget is configured in megabytes. """
+        try:
+            return int(self._config["COMMON"]["audio_cache_budget"]) * 1024 * 1024
+        except (KeyError, ValueError):
+            default = self.DEFAULTS["audio_cache_budget"]
+            logger.info(f"Could not obtain audio cache budget from 'conf.ini'. Defaulting to '{default}'MB")
+            return int(default) * 1024 * 1024
+        
+    
+    def get_profile_frames(self) -> int:
+        """ Return the number of main loop frames captured by a single profile capture. """
+        try:
+            frames = int(self._config["COMMON"]["profile_frames"])
+            if frames <= 0:
+                raise ValueError(frames)
+            return frames
+        except (KeyError, ValueError):
+            default = self.DEFAULTS["profile_frames"]
+            logger.info(f"Could not obtain profile frame count from 'conf.ini'. Defaulting to '{default}'")
+            return int(default)
+        
+    
+    def _save(self) -> None:
+        with open(self.CONFIG_PATH, "w") as file:
+            self._config.write(file)
+    
+    
     def __getitem__(self, name: str) -> str:
-        return ''
+        if name in self._pending:
+            return self._pending[name]
+        
+        return self._config.get("COMMON", name, fallback=self.DEFAULTS.get(name, ''))
     
     
     def __setitem__(self, name: str, value: str) -> None:
-        return
\ No newline at end of file
+        self.settings_set(**{name: value})
\ No newline at end of file
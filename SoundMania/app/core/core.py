@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from functools import partial
+from types import MemberDescriptorType
 from typing import Any, Callable
 
 
@@ -15,6 +16,9 @@ class callback_property(property):
 
         When setting a callbackproperty to a callable, it's automatically injected
         with a `self`-like argument.
+        
+        The callback of a property named `name` is kept in the `_name` attribute. Slotted
+        classes have to declare it in their `__slots__`.
     """
     def __init__(self):
         """ Make a new descriptor property for callable types. """
@@ -28,11 +32,12 @@ class callback_property(property):
     
     def __set_name__(self, obj: type, name: str) -> None:
         self.callback_accessor = f"_{name}"
-        setattr(obj, self.callback_accessor, self.NO_OP)
+        if not isinstance(obj.__dict__.get(self.callback_accessor), MemberDescriptorType): # keep the slot of slotted classes
+            setattr(obj, self.callback_accessor, self.NO_OP)
 
 
     def getter(self, obj: Any) -> Callable: # type: ignore
-        return getattr(obj, self.callback_accessor)
+        return getattr(obj, self.callback_accessor, self.NO_OP) # an unset slot has no value yet
     
     
     def setter(self, obj: Any, value: Callable[[Any], Any] | None) -> None: # type: ignore
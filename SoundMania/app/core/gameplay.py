@@ -0,0 +1,72 @@
+from core.chart import ChartData
+from core.judgement import Judgement, JudgementEngine, JudgementWindows
+from core.replay import ReplayWriter
+from core.songclock import SongClock
+
+
+class GameplaySession:
+    """ Gameplay update path of a single chart play.
+
+        The session ties a chart, a song clock, the judgement engine and an optional replay recording
+        together. It doesn't depend on pygame, so the same update path is driven both by `MapPlayerView`
+        and by the headless autoplay simulator.
+    """
+    def __init__(self, chart: ChartData, clock: SongClock, windows: JudgementWindows = JudgementWindows(), input_offsets: dict[str, float] | None = None):
+        self.chart = chart
+        self.clock = clock
+        self.input_offsets = input_offsets or {} # per-device input latencies in ms, subtracted from the input timestamps
+        self.judgement_engine = JudgementEngine(chart.lanes, chart.hold_ends, windows)
+        self.replay_writer: ReplayWriter | None = None
+
+
+    @property
+    def finished(self) -> bool:
+        return self.judgement_engine.finished
+
+
+    @property
+    def counts(self) -> dict[Judgement, int]:
+        return self.judgement_engine.counts
+
+
+    def start_recording(self, map_path: str) -> None:
+        """ Start recording the inputs and judgements of the session to a new replay file. """
+        self.stop_recording()
+
+        self.replay_writer = ReplayWriter.for_map(map_path)
+        self.judgement_engine.on_judgement = self.replay_writer.record_judgement
+
+
+    def stop_recording(self) -> None:
+        if self.replay_writer:
+            self.replay_writer.close()
+            self.replay_writer = None
+            self.judgement_engine.on_judgement = None
+
+
+    def lane_input(self, lane: int, pressed: bool, device: str = "keyboard") -> None:
+        """ Handle a lane press or release at the current song position, compensated by the input device latency. """
+        position = self.clock.position - self.input_offsets.get(device, 0)
+        if self.replay_writer:
+            self.replay_writer.record_input(position, lane, pressed)
+
+        if pressed:
+            self.judgement_engine.press(lane, position)
+        else:
+            self.judgement_engine.release(lane, position)
+
+
+    def update(self) -> float:
+        """ Advance the session to the current song position.
+
+            Returns:
+                the song position the session was advanced to
+        """
+        position = self.clock.position
+        self.judgement_engine.advance(position)
+
+        if self.replay_writer and self.finished:
+            self.stop_recording()
+
+        return position
+
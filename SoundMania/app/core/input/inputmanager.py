@@ -1,16 +1,20 @@
-from typing import Any, Callable
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable
 
 import pygame
 
-from core.input.smcontroller import SMController
 from core.input import SMEvent
 
+if TYPE_CHECKING:
+    from core.input.smcontroller import SMController
+
 
 class InputManager:
     """ Manager class responsible for generating events. """
     def __init__(self):
-        self.controller = self._controller_init()
+        self.controller: SMController | None = None # connected lazily on the first update, after the first frame is shown
         self._last_knob_read = {"L": 0, "R": 0}
+        self.controller_key_conversion = True # tells whether controller buttons also post converted key events
         
         self._controller_conversions = {
             "OL": pygame.K_RETURN,
@@ -30,10 +34,15 @@ class InputManager:
     
     
     def update(self, dt: int) -> None:
+        if self.controller is None:
+            self.controller = self._controller_init()
+            
         self.controller.update(dt)
         
         
     def _controller_init(self) -> SMController:
+        from core.input.smcontroller import SMController # imports pyserial
+        
         con = SMController()
         
         con.on_ol_button_state_changed = self._con_button_handler("OL")
@@ -54,7 +63,7 @@ class InputManager:
             pygame.event.post(pygame.event.Event(smevent_type, button=button_label))
             
             converted_key = self._controller_conversions.get(button_label)
-            if converted_key:
+            if converted_key and self.controller_key_conversion:
                 pgevent_type = pygame.KEYDOWN if new_state else pygame.KEYUP
                 pygame.event.post(pygame.event.Event(pgevent_type, key=converted_key))
             
@@ -0,0 +1,213 @@
+from bisect import bisect_left
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Callable, Sequence
+
+
+class Judgement(IntEnum):
+    PERFECT = 0
+    GREAT   = 1
+    GOOD    = 2
+    MISS    = 3
+
+
+@dataclass(frozen=True)
+class JudgementWindows:
+    """ Hit windows in miliseconds, given as the maximum absolute offset from a note.
+
+        Presses further than `miss` from any unjudged note are ignored.
+    """
+    perfect: float = 22
+    great: float = 45
+    good: float = 90
+    miss: float = 135
+
+    def judge(self, offset: float) -> Judgement:
+        offset = abs(offset)
+        if offset <= self.perfect:
+            return Judgement.PERFECT
+        if offset <= self.great:
+            return Judgement.GREAT
+        if offset <= self.good:
+            return Judgement.GOOD
+        return Judgement.MISS
+
+
+@dataclass(slots=True)
+class JudgementResult:
+    lane: int
+    note: int
+    time: float
+    offset: float
+    judgement: Judgement
+    release: bool = False # tells whether the result judges the tail of a hold note
+
+
+class JudgementEngine:
+    """ Class responsible for judging player input against a chart.
+
+        The engine keeps a cursor per lane pointing at the first unjudged note, so matching an input
+        only takes a binary search and a scan over the notes within the miss window. It doesn't depend
+        on pygame and can be driven by any time source.
+    """
+    def __init__(self,
+                 lanes: Sequence[Sequence[float]],
+                 hold_ends: Sequence[Sequence[float]] | None = None,
+                 windows: JudgementWindows = JudgementWindows(),
+                 keep_results: bool = True):
+        """ Make a new judgement engine for a chart.
+
+            Args:
+                lanes: sequence of sorted note timestamp arrays in miliseconds, one per lane
+                hold_ends: optional sequence of hold end timestamp arrays, parallel to `lanes`. A note
+                    is a hold note when its end timestamp is greater than its start timestamp
+                windows: hit windows used for judging the offsets
+                keep_results: tells whether to collect every result in `self.results`. Results are still
+                    counted and passed to `self.on_judgement` when disabled
+        """
+        if hold_ends is not None and [len(l) for l in lanes] != [len(h) for h in hold_ends]:
+            raise ValueError("hold_ends must have the same shape as lanes")
+
+        self.lanes = lanes
+        self.hold_ends = hold_ends
+        self.windows = windows
+        self.keep_results = keep_results
+
+        self.results: list[JudgementResult] = []
+        self.counts = {judgement: 0 for judgement in Judgement}
+        self.on_judgement: Callable[[JudgementResult], None] | None = None
+
+        self._cursors = [0] * len(lanes)
+        self._judged = [bytearray(len(times)) for times in lanes]
+        self._holding: list[int | None] = [None] * len(lanes)
+
+
+    @property
+    def note_count(self) -> int:
+        return sum(len(times) for times in self.lanes)
+
+
+    @property
+    def cursors(self) -> Sequence[int]:
+        """ Per-lane indices of the first unjudged note. """
+        return self._cursors
+
+
+    @property
+    def finished(self) -> bool:
+        """ Tell whether every note of the chart has been judged. """
+        return all(cursor == len(times) for cursor, times in zip(self._cursors, self.lanes)) and not any(h is not None for h in self._holding)
+
+
+    def press(self, lane: int, time: float) -> JudgementResult | None:
+        """ Judge a lane press against the nearest unjudged note.
+
+            Args:
+                lane: index of the pressed lane
+                time: timestamp of the press in miliseconds
+
+            Returns:
+                the judgement result, or `None` when no unjudged note is within the miss window
+        """
+        times = self.lanes[lane]
+        judged = self._judged[lane]
+        miss = self.windows.miss
+
+        note = None
+        offset = 0.0
+        i = bisect_left(times, time - miss, lo=self._cursors[lane])
+        while i < len(times) and times[i] <= time + miss:
+            if not judged[i]:
+                candidate = time - times[i]
+                if note is not None and abs(candidate) >= abs(offset):
+                    break # notes are sorted, so the offsets only grow from here
+                note, offset = i, candidate
+            i += 1
+
+        if note is None:
+            return None
+
+        result = self._judge(lane, note, time, offset, self.windows.judge(offset))
+        if self._is_hold(lane, note):
+            if result.judgement == Judgement.MISS:
+                self._record(JudgementResult(lane, note, time, offset, Judgement.MISS, release=True))
+            else:
+                self._holding[lane] = note
+
+        return result
+
+
+    def release(self, lane: int, time: float) -> JudgementResult | None:
+        """ Judge a lane release against the end of the currently held note.
+
+            Args:
+                lane: index of the released lane
+                time: timestamp of the release in miliseconds
+
+            Returns:
+                the judgement result, or `None` when no hold note is being held in the lane
+        """
+        note = self._holding[lane]
+        if note is None:
+            return None
+
+        assert self.hold_ends is not None
+        offset = time - self.hold_ends[lane][note]
+        judgement = self.windows.judge(offset) if offset >= -self.windows.good else Judgement.MISS
+
+        self._holding[lane] = None
+        return self._record(JudgementResult(lane, note, time, offset, judgement, release=True))
+
+
+    def advance(self, time: float) -> None:
+        """ Advance the engine to a given time, missing every note that can no longer be hit,
+            and completing holds which were held up to their end.
+
+            Args:
+                time: current song position in miliseconds
+        """
+        miss = self.windows.miss
+        for lane, times in enumerate(self.lanes):
+            note = self._holding[lane]
+            if note is not None and self.hold_ends is not None and time >= self.hold_ends[lane][note]:
+                self._holding[lane] = None
+                self._record(JudgementResult(lane, note, time, 0.0, Judgement.PERFECT, release=True))
+
+            cursor = self._cursors[lane]
+            judged = self._judged[lane]
+            while cursor < len(times) and (judged[cursor] or times[cursor] + miss < time):
+                if not judged[cursor]:
+                    judged[cursor] = 1
+                    offset = time - times[cursor]
+                    self._record(JudgementResult(lane, cursor, time, offset, Judgement.MISS))
+                    if self._is_hold(lane, cursor):
+                        self._record(JudgementResult(lane, cursor, time, offset, Judgement.MISS, release=True))
+                cursor += 1
+            self._cursors[lane] = cursor
+
+
+    def _judge(self, lane: int, note: int, time: float, offset: float, judgement: Judgement) -> JudgementResult:
+        judged = self._judged[lane]
+        judged[note] = 1
+
+        cursor = self._cursors[lane]
+        while cursor < len(judged) and judged[cursor]:
+            cursor += 1
+        self._cursors[lane] = cursor
+
+        return self._record(JudgementResult(lane, note, time, offset, judgement))
+
+
+    def _record(self, result: JudgementResult) -> JudgementResult:
+        if self.keep_results:
+            self.results.append(result)
+        self.counts[result.judgement] += 1
+        if self.on_judgement:
+            self.on_judgement(result)
+
+        return result
+
+
+    def _is_hold(self, lane: int, note: int) -> bool:
+        return self.hold_ends is not None and self.hold_ends[lane][note] > self.lanes[lane][note]
+
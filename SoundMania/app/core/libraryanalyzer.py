@@ -0,0 +1,204 @@
+from __future__ import annotations
+from dataclasses import dataclass, asdict
+from heapq import merge
+import hashlib
+import json
+import os
+
+from core.chart import ChartCompiler, ChartSyntaxError
+from core.mapmanager import MapManager
+
+import logging
+logger = logging.getLogger("LibraryAnalyzer")
+
+
+@dataclass(slots=True)
+class MapStats:
+    """ Difficulty and density statistics of a map. Durations are given in miliseconds. """
+    signature: str
+    notes: int
+    length: float
+    song_length: float | None
+    nps: float
+    peak_nps: float
+    peak_time: float
+    bpm_min: float
+    bpm_max: float
+
+    @property
+    def difficulty(self) -> float:
+        """ Rough difficulty rating, weighting the sustained and the peak note density. """
+        return 0.7 * self.nps + 0.3 * self.peak_nps
+
+
+def analyze_map(map_path: str, song_path: str, signature: str, analyze_audio: bool = True) -> MapStats | None:
+    """ Compute the statistics of a single map. Meant to be run in a worker process. """
+    try:
+        chart = ChartCompiler.load(map_path)
+    except (FileNotFoundError, ChartSyntaxError) as e:
+        logger.warning(f"Could not analyze '{map_path}': {e}")
+        return None
+
+    starts = list(merge(*chart.lanes))
+    ends = [end for lane in chart.hold_ends for end in lane]
+    bpms = [60000 / length for length in chart.segment_beat_lengths]
+    chart.close()
+
+    length = max(ends) - starts[0] if starts else 0
+    peak_notes, peak_time = _peak_density(starts, LibraryAnalyzer.PEAK_WINDOW)
+
+    return MapStats(
+        signature=signature,
+        notes=len(starts),
+        length=length,
+        song_length=_song_length(song_path) if analyze_audio else None,
+        nps=len(starts) / length * 1000 if length else 0,
+        peak_nps=peak_notes / LibraryAnalyzer.PEAK_WINDOW * 1000,
+        peak_time=peak_time,
+        bpm_min=min(bpms),
+        bpm_max=max(bpms)
+    )
+
+
+def _peak_density(starts: list[float], window: float) -> tuple[int, float]:
+    """ Find the window of a given length containing the most notes with a sliding window over sorted timestamps. """
+    peak, peak_time = 0, 0.0
+    lo = 0
+    for hi, time in enumerate(starts):
+        while starts[lo] <= time - window:
+            lo += 1
+        if hi - lo + 1 > peak:
+            peak, peak_time = hi - lo + 1, starts[lo]
+
+    return peak, peak_time
+
+
+def _song_length(song_path: str) -> float | None:
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame # imported lazily, so pygame is only loaded in workers analyzing audio
+
+    try:
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        return pygame.mixer.Sound(song_path).get_length() * 1000
+    except pygame.error as e:
+        logger.warning(f"Could not decode '{song_path}': {e}")
+        return None
+
+
+class LibraryAnalyzer:
+    """ Class responsible for maintaining a persistent index of statistics of all maps in the library.
+
+        Maps are analyzed in a process pool, and only maps whose chart or song changed since they
+        were last analyzed get recomputed. Maps which can't be analyzed, e.g. maps without a chart,
+        are remembered under their signature too, so they're not retried until they change.
+    """
+    INDEX_FILE_NAME = "stats.index.json"
+    INDEX_VERSION = 1
+    PEAK_WINDOW = 1000 # length of the peak note density window in ms
+
+    def __init__(self, map_manager: MapManager, index_path: str | None = None):
+        self.map_manager = map_manager
+        self.index_path = index_path or os.path.join(map_manager.local_path, self.INDEX_FILE_NAME)
+        self._unanalyzable: dict[str, str] = {} # map path -> signature of maps which couldn't be analyzed
+        self.index: dict[str, MapStats] = self._load_index()
+
+
+    def get_stats(self, map_path: str) -> MapStats | None:
+        return self.index.get(map_path)
+
+
+    def analyze(self, max_workers: int | None = None, analyze_audio: bool = True) -> dict[str, MapStats]:
+        """ Bring the stats index up to date with the map library and save it.
+
+            Args:
+                max_workers: number of worker processes, defaults to the number of processors
+                analyze_audio: tells whether to decode the songs to measure their length
+
+            Returns:
+                the updated index
+        """
+        map_paths = self.map_manager.load_available_maps()
+
+        stale = []
+        for map_path in map_paths:
+            signature = self.signature(map_path)
+            if signature is None:
+                self.index.pop(map_path, None)
+                continue
+
+            stats = self.index.get(map_path)
+            if (stats is None or stats.signature != signature) and self._unanalyzable.get(map_path) != signature:
+                stale.append((map_path, self.map_manager.get_map_info(map_path).song_path, signature))
+
+        logger.info(f"{len(stale)} of {len(map_paths)} maps need to be analyzed")
+        if stale:
+            from concurrent.futures import ProcessPoolExecutor # only needed when maps changed
+            with ProcessPoolExecutor(max_workers) as pool:
+                args = list(zip(*stale)) + [[analyze_audio] * len(stale)]
+                for (map_path, _, signature), stats in zip(stale, pool.map(analyze_map, *args, chunksize=8)):
+                    if stats:
+                        self.index[map_path] = stats
+                        self._unanalyzable.pop(map_path, None)
+                    else:
+                        self.index.pop(map_path, None)
+                        self._unanalyzable[map_path] = signature
+
+        available = set(map_paths)
+        for removed in [p for p in self.index if p not in available]:
+            del self.index[removed]
+        for removed in [p for p in self._unanalyzable if p not in available]:
+            del self._unanalyzable[removed]
+
+        self._save_index()
+        return self.index
+
+
+    def signature(self, map_path: str) -> str | None:
+        """ Return a signature of the map content, changing whenever its chart or song changes, or `None` when its song is missing. """
+        digest = hashlib.sha1()
+        try:
+            with open(os.path.join(map_path, ChartCompiler.SOURCE_FILE_NAME), "rb") as file:
+                digest.update(file.read())
+        except FileNotFoundError:
+            pass
+
+        try:
+            song_stat = os.stat(self.map_manager.get_map_info(map_path).song_path)
+        except (OSError, KeyError) as e:
+            logger.warning(f"Could not analyze '{map_path}': {e}")
+            return None
+
+        digest.update(f"{song_stat.st_size}:{song_stat.st_mtime_ns}".encode())
+        return digest.hexdigest()
+
+
+    def _load_index(self) -> dict[str, MapStats]:
+        try:
+            with open(self.index_path, "r") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning(f"Stats index '{self.index_path}' is corrupted and will be rebuilt")
+            return {}
+
+        if data.get("version") != self.INDEX_VERSION:
+            return {}
+
+        self._unanalyzable = data.get("unanalyzable", {})
+        return {path: MapStats(**stats) for path, stats in data["maps"].items()}
+
+
+    def _save_index(self) -> None:
+        data = {
+            "version": self.INDEX_VERSION,
+            "maps": {path: asdict(stats) for path, stats in self.index.items()},
+            "unanalyzable": self._unanalyzable
+        }
+
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, self.index_path)
+
@@ -1,26 +1,92 @@
+from __future__ import annotations
+from bisect import bisect_left, insort
 from dataclasses import dataclass
+from queue import SimpleQueue, Empty
+from stat import S_ISDIR
+from typing import TYPE_CHECKING, Iterable, Literal, Mapping
 import os
+import unicodedata
+
+from core.taskscheduler import TaskScheduler
+
+if TYPE_CHECKING:
+    from core.libraryanalyzer import MapStats
 
 import logging
 logger = logging.getLogger("MapManager")
 
 
-@dataclass
+@dataclass(slots=True)
 class MapInfo:
     map_path: str
     song_author: str
     song_title: str
     song_path: str
+    preview_offset: int = 0 # song position in ms the preview starts at
+    date_added: float = 0   # timestamp of the map directory creation
+    
+    
+MapOrdering = Literal["title", "author", "length", "difficulty", "date"]
+
+
+def _normalize(text: str) -> str:
+    """ Return a case and accent insensitive form of a text, to be compared in sort keys. """
+    if text.isascii(): # fast path for the most common case, plain ASCII has nothing to decompose
+        return text.casefold().strip()
+    
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
     
     
 class MapManager:
+    """ Class responsible for discovering, parsing and ordering the maps of the library.
+    
+        Every map has a precomputed sort key for each of the `ORDERINGS`, and every ordering keeps its own sorted
+        list of map paths. The lists are updated incrementally as maps are parsed, dropped or analyzed, so changing
+        the ordering is instant and never re-reads any metadata.
+    """
     MAP_EXTENSION = ".smm"
     INFO_FILE_NAME = "info"
+    ORDERINGS: tuple[MapOrdering, ...] = ("title", "author", "length", "difficulty", "date")
+    SCAN_SORT_INTERVAL = 1000 # ms between two updates of the orderings with the maps parsed by a running scan
     
-    def __init__(self, map_dir_path: str): 
+    def __init__(self, map_dir_path: str, ordering: MapOrdering = "title"): 
         self.local_path = map_dir_path
         self._map_info_cache: dict[str, MapInfo] = {}
         
+        self.ordering: MapOrdering = ordering
+        self.scanning = False
+        self.version = 0 # incremented whenever `available_maps`, their ordering or the cached map info change
+        self._scan_results: SimpleQueue[list[str] | tuple[str, MapInfo | None]] = SimpleQueue() # discovered paths or parse results
+        self._stats: dict[str, MapStats] = {}
+        self._sort_keys: dict[MapOrdering, dict[str, tuple]] = {ordering: {} for ordering in self.ORDERINGS}
+        self._orderings: dict[MapOrdering, list[str]] = {ordering: [] for ordering in self.ORDERINGS}
+        self._unsorted: list[str] = [] # parsed maps still sorted by their placeholder keys
+        self._since_sort = 0
+        
+        
+    @property
+    def available_maps(self) -> list[str]:
+        """ Paths of the maps discovered by the background scan, sorted by the current ordering. """
+        return self._orderings[self.ordering]
+        
+        
+    def set_ordering(self, ordering: MapOrdering) -> None:
+        """ Change the order of `available_maps`. """
+        if ordering not in self.ORDERINGS:
+            raise ValueError(f"unknown map ordering '{ordering}'")
+        
+        if ordering != self.ordering:
+            self.ordering = ordering
+            self.version += 1
+            
+            
+    def set_map_stats(self, stats: Mapping[str, MapStats]) -> None:
+        """ Provide the map statistics used by the length and difficulty orderings, usually `LibraryAnalyzer.index`. """
+        self._stats.update(stats)
+        self._update_sort_keys(stats, ("length", "difficulty"))
+        self.version += 1
+        
         
     def get_map_info(self, path: str) -> MapInfo:
         """ Extract a MapInfo object from a specified path to an existing map directory. """
@@ -36,6 +102,58 @@ class MapManager:
         return map_info
     
     
+    def peek_map_info(self, path: str) -> MapInfo | None:
+        """ Return the MapInfo object of a map, or `None` when the map hasn't been parsed yet. Never touches the disk. """
+        return self._map_info_cache.get(path)
+    
+    
+    def scan(self, task_scheduler: TaskScheduler) -> None:
+        """ Start scanning the map directory in the background.
+        
+            Map directories are discovered first and show up in `available_maps` right away, then their info
+            files are parsed one by one. Results are streamed to the main loop and applied in `process()`,
+            invalid maps being dropped from `available_maps` as they are found.
+        """
+        if self.scanning:
+            return
+        
+        self.scanning = True
+        future = task_scheduler.submit(self._scan_worker, self.local_path, self._scan_results, callback=self._on_scan_finished)
+        future.add_done_callback(lambda _: setattr(self, "scanning", False))
+        
+        
+    def process(self, dt: int) -> None:
+        """ Apply the results streamed by the background scan.
+        
+            Every update of the orderings takes time linear in the library size, so while the scan is running,
+            parsed maps are moved to their places in batches at most every `SCAN_SORT_INTERVAL` ms.
+        """
+        while True:
+            try:
+                result = self._scan_results.get_nowait()
+            except Empty:
+                break
+            
+            if isinstance(result, list):
+                self._set_maps(result)
+                self._unsorted.clear()
+            else:
+                path, map_info = result
+                if map_info is None:
+                    self._remove_map(path)
+                else:
+                    self._map_info_cache[path] = map_info
+                    self._unsorted.append(path)
+            self.version += 1
+            
+        self._since_sort += dt
+        if self._unsorted and (not self.scanning or self._since_sort >= self.SCAN_SORT_INTERVAL):
+            self._update_sort_keys(self._unsorted)
+            self._unsorted.clear()
+            self._since_sort = 0
+            self.version += 1
+        
+        
     def load_available_maps(self) -> list[str]:
         """ Load to the managers cache and return all avaiable map paths. """
         available = [] 
@@ -45,10 +163,101 @@ class MapManager:
             if self._register_map(full_path):
                 available.append(full_path)
                 
+        self._set_maps(available)
+        self.version += 1
         logger.info(f"Successfully loaded {len(available)} maps")
         return available
     
     
+    def _on_scan_finished(self, count: int) -> None:
+        self.process(0)
+        logger.info(f"Successfully scanned {count} maps")
+        
+        
+    @classmethod
+    def _scan_worker(cls, local_path: str, results: SimpleQueue) -> int:
+        """ Discover and parse all maps in a directory, streaming the results through a queue. Runs on a worker thread. """
+        try:
+            paths = [os.path.join(local_path, p) for p in os.listdir(local_path) if p.endswith(cls.MAP_EXTENSION)]
+        except FileNotFoundError:
+            logger.error(f"Map directory '{local_path}' does not exist")
+            paths = []
+        results.put(paths.copy())
+        
+        count = 0
+        for path in paths:
+            map_info = cls._parse_map_info(path)
+            results.put((path, map_info))
+            count += map_info is not None
+            
+        return count
+    
+    
+    def _set_maps(self, paths: list[str]) -> None:
+        """ Replace the maps of the library, sorting every ordering from scratch. """
+        for ordering in self.ORDERINGS:
+            self._sort_keys[ordering] = {}
+        for path in paths:
+            for ordering, key in self._make_sort_keys(path).items():
+                self._sort_keys[ordering][path] = key
+                
+        for ordering in self.ORDERINGS:
+            self._orderings[ordering] = sorted(paths, key=self._sort_keys[ordering].__getitem__)
+            
+            
+    def _remove_map(self, path: str) -> None:
+        for ordering in self.ORDERINGS:
+            keys, maps = self._sort_keys[ordering], self._orderings[ordering]
+            if path in keys:
+                del maps[bisect_left(maps, keys[path], key=keys.__getitem__)]
+                del keys[path]
+                
+                
+    def _update_sort_keys(self, paths: Iterable[str], orderings: Iterable[MapOrdering] = ORDERINGS) -> None:
+        """ Recompute the sort keys of already indexed maps and move them to their new places in the orderings.
+        
+            Sort keys are unique, thanks to the map path breaking the ties, so a map can be found by its key with a binary search.
+        """
+        indexed = self._sort_keys["title"]
+        new_keys = {path: self._make_sort_keys(path) for path in paths if path in indexed}
+        # moving maps one by one beats re-sorting for batches smaller than about 2 * sqrt(library size)
+        incremental = len(new_keys) ** 2 <= 4 * len(indexed)
+        
+        for ordering in orderings:
+            keys, maps = self._sort_keys[ordering], self._orderings[ordering]
+            for path, path_keys in new_keys.items():
+                if incremental:
+                    del maps[bisect_left(maps, keys[path], key=keys.__getitem__)]
+                    keys[path] = path_keys[ordering]
+                    insort(maps, path, key=keys.__getitem__)
+                else:
+                    keys[path] = path_keys[ordering]
+                    
+            if not incremental:
+                maps.sort(key=keys.__getitem__) # runs of unchanged maps are still in order, which the sort takes advantage of
+                
+                
+    def _make_sort_keys(self, path: str) -> dict[MapOrdering, tuple]:
+        """ Compute the sort keys of a map. Maps not parsed yet go last in every ordering, sorted by their path. """
+        map_info = self._map_info_cache.get(path)
+        if map_info is None:
+            return dict.fromkeys(self.ORDERINGS, (True, path))
+        
+        title, author = _normalize(map_info.song_title), _normalize(map_info.song_author)
+        stats = self._stats.get(path)
+        length = stats and (stats.song_length or stats.length)
+        difficulty = stats and stats.difficulty
+        
+        # maps without stats go after the ones with stats, and the map path breaks the remaining ties
+        return {
+            "title":      (False, title, author, path),
+            "author":     (False, author, title, path),
+            "length":     (False, length is None, length or 0, title, path),
+            "difficulty": (False, difficulty is None, difficulty or 0, title, path),
+            "date":       (False, -map_info.date_added, title, path), # newest first
+        }
+        
+        
     def _register_map(self, path: str) -> bool:
         map_info = self._parse_map_info(path)
         if not map_info:
@@ -65,17 +274,30 @@ class MapManager:
             Returns:
                 a new MapInfo object on successful parse, otherwise `None` 
         """
-        if os.path.isdir(path) and path.endswith(cls.MAP_EXTENSION):
+        try:
+            path_stat = os.stat(path)
+        except OSError:
+            return None
+        
+        if S_ISDIR(path_stat.st_mode) and path.endswith(cls.MAP_EXTENSION):
             info_file_path = os.path.join(path, cls.INFO_FILE_NAME)
             
-            if not os.path.isfile(info_file_path):
+            try:
+                info_file = open(info_file_path, 'r')
+            except OSError:
                 logger.warn(f"{path} map exists, but info file is missing")
                 return None
             
-            with open(info_file_path, 'r') as info_file:
+            with info_file:
                 author = info_file.readline().strip() or "???"
                 name = info_file.readline().strip() or "???"
                 
+                try:
+                    preview_offset = max(int(info_file.readline().strip() or 0), 0)
+                except ValueError:
+                    logger.warn(f"{path} map has an invalid preview offset, defaulting to 0")
+                    preview_offset = 0
+                
                 music_paths = [p for p in os.listdir(path) if p.endswith((".mp3", ".ogg"))]
                 if not music_paths:
                     logger.warn(f"{path} map exists, but music file is missing")
@@ -87,7 +309,7 @@ class MapManager:
                 
                 song_path = os.path.join(path, music_paths[0])
             
-            return MapInfo(path, author, name, song_path)
+            return MapInfo(path, author, name, song_path, preview_offset, path_stat.st_ctime) # creation time on Windows
         
         return None
         
\ No newline at end of file
@@ -0,0 +1,169 @@
+from __future__ import annotations
+from time import perf_counter, strftime
+import cProfile
+import csv
+import io
+import os
+import pstats
+
+from core.taskscheduler import TaskScheduler
+
+import logging
+logger = logging.getLogger("FrameProfiler")
+
+
+class FrameProfiler:
+    """ Class responsible for capturing profiles of the main loop on demand, without restarting the game.
+
+        A capture profiles the next `frame_count` frames with `cProfile` and times the main loop phases
+        delimited with `mark()`. Once it's done, the profile stats, a per-frame phase breakdown and a short
+        text summary are written to disk in the background, tagged with the view active when the capture started.
+
+        While no capture is running, each call costs a single attribute check.
+    """
+    DIRECTORY = os.path.join("SoundMania", "locals", "profiles")
+    FRAME_COUNT = 300
+    SUMMARY_FUNCTIONS = 30 # number of functions listed in the text summary
+    SUMMARY_FRAMES = 10    # number of the slowest frames listed in the text summary
+
+    def __init__(self, task_scheduler: TaskScheduler, frame_count: int = FRAME_COUNT, directory: str = DIRECTORY):
+        """ Make a new frame profiler.
+
+            Args:
+                task_scheduler: scheduler writing the captures to disk
+                frame_count: default number of frames captured at once
+                directory: directory the captures are written to
+        """
+        self.task_scheduler = task_scheduler
+        self.frame_count = frame_count
+        self.directory = directory
+
+        self._requested = 0 # number of frames of the requested capture, started with the next frame
+        self._profile: cProfile.Profile | None = None
+        self._remaining = 0
+        self._view_name = ""
+        self._frames: list[dict[str, float | str]] = [] # per-frame view name, frame time and phase durations in ms
+        self._phase_start = 0.0
+
+
+    @property
+    def capturing(self) -> bool:
+        return self._profile is not None
+
+
+    def start(self, frame_count: int | None = None) -> None:
+        """ Request capturing the next `frame_count` frames, unless a capture is already running. """
+        if self.capturing or self._requested:
+            logger.info("A profile capture is already running")
+            return
+
+        self._requested = frame_count or self.frame_count
+
+
+    def begin_frame(self, dt: int, view_name: str) -> None:
+        """ Mark the start of a frame, starting the requested capture.
+
+            Args:
+                dt: elapsed time since the last frame
+                view_name: name of the active view
+        """
+        if self._requested:
+            self._begin_capture(view_name)
+
+        if self._profile is None:
+            return
+
+        self._frames.append({"view": view_name, "dt": dt})
+        self._phase_start = perf_counter()
+
+
+    def mark(self, phase: str) -> None:
+        """ Mark the end of a main loop phase. The phase starts where the previous one has ended. """
+        if self._profile is None:
+            return
+
+        now = perf_counter()
+        self._frames[-1][phase] = (now - self._phase_start) * 1000
+        self._phase_start = now
+
+
+    def end_frame(self) -> None:
+        """ Mark the end of a frame, finishing the capture after its last frame. """
+        if self._profile is None:
+            return
+
+        self._remaining -= 1
+        if self._remaining <= 0:
+            self._finish_capture()
+
+
+    def _begin_capture(self, view_name: str) -> None:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e: # another profiler is already active, e.g. when run under `python -m cProfile`
+            logger.error(f"Could not start a profile capture: {e}")
+            self._requested = 0
+            return
+
+        logger.info(f"Profiling the next {self._requested} frames of {view_name}")
+        self._profile = profile
+        self._remaining = self._requested
+        self._requested = 0
+        self._view_name = view_name
+        self._frames = []
+
+
+    def _finish_capture(self) -> None:
+        assert self._profile is not None
+        self._profile.disable()
+
+        base_path = os.path.join(self.directory, f"{strftime('%Y%m%d-%H%M%S')}_{self._view_name}")
+        self.task_scheduler.submit(self._save, self._profile, self._frames, base_path, callback=self._on_saved)
+        self._profile = None
+        self._frames = []
+
+
+    def _on_saved(self, base_path: str) -> None:
+        logger.info(f"Profile capture saved to '{base_path}.prof', '.csv' and '.txt'")
+
+
+    @classmethod
+    def _save(cls, profile: cProfile.Profile, frames: list[dict[str, float | str]], base_path: str) -> str:
+        """ Write the profile stats, the per-frame breakdown and the summary of a capture. Runs on a worker thread. """
+        os.makedirs(os.path.dirname(base_path), exist_ok=True)
+        profile.dump_stats(base_path + ".prof")
+
+        phases = list(dict.fromkeys(phase for frame in frames for phase in frame if phase not in ("view", "dt")))
+        for frame in frames:
+            frame["total"] = sum(frame.get(phase, 0) for phase in phases) # type: ignore
+
+        with open(base_path + ".csv", "w", newline="") as file:
+            writer = csv.DictWriter(file, ["frame", "view", "dt", *phases, "total"], restval=0, extrasaction="ignore")
+            writer.writeheader()
+            for i, frame in enumerate(frames):
+                writer.writerow({"frame": i, **{k: round(v, 3) if isinstance(v, float) else v for k, v in frame.items()}})
+
+        with open(base_path + ".txt", "w") as file:
+            file.write(cls._format_summary(profile, frames, phases))
+
+        return base_path
+
+
+    @classmethod
+    def _format_summary(cls, profile: cProfile.Profile, frames: list[dict[str, float | str]], phases: list[str]) -> str:
+        totals = [float(frame["total"]) for frame in frames]
+        lines = [f"{len(frames)} frames, average {sum(totals) / max(len(totals), 1):.2f}ms, worst {max(totals, default=0):.2f}ms", ""]
+
+        lines.append("Slowest frames:")
+        lines.append(f"{'frame':>6} {'view':<20} {'total':>9} " + " ".join(f"{phase:>9}" for phase in phases))
+        slowest = sorted(range(len(frames)), key=lambda i: totals[i], reverse=True)[:cls.SUMMARY_FRAMES]
+        for i in slowest:
+            frame = frames[i]
+            lines.append(f"{i:>6} {frame['view']:<20} {totals[i]:>7.2f}ms " + " ".join(f"{float(frame.get(phase, 0)):>7.2f}ms" for phase in phases))
+
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(cls.SUMMARY_FUNCTIONS)
+        lines.append("")
+        lines.append(stream.getvalue())
+        return "\n".join(lines)
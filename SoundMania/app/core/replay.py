@@ -0,0 +1,242 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from queue import SimpleQueue
+from threading import Thread
+from time import monotonic, time as unix_time
+from typing import BinaryIO, ClassVar, Iterable, Iterator
+import os
+import struct
+
+from core.judgement import Judgement, JudgementResult
+
+import logging
+logger = logging.getLogger("Replay")
+
+
+@dataclass
+class ReplayHeader:
+    map_path: str
+    recorded_at: float # unix timestamp
+
+
+@dataclass(slots=True)
+class ReplayInput:
+    time: float
+    lane: int
+    pressed: bool
+
+
+ReplayRecord = ReplayHeader | ReplayInput | JudgementResult
+
+
+class _Record:
+    """ Binary layout of replay records. Every record is prefixed with its payload length and type. """
+    MAGIC = b"SMR\x00"
+    VERSION = 1
+
+    PREFIX    = struct.Struct("<HB")
+    HEADER    = 0
+    INPUT     = 1
+    JUDGEMENT = 2
+
+    INPUT_PAYLOAD     = struct.Struct("<dB?")
+    JUDGEMENT_PAYLOAD = struct.Struct("<BIddB?")
+    HEADER_PAYLOAD    = struct.Struct("<d") # followed by the utf-8 encoded map path
+
+
+class ReplayWriter:
+    """ Class responsible for streaming gameplay inputs and judgements to a replay file.
+
+        Records are packed into an in-memory buffer, which is handed over to a writer thread once full,
+        so the frame path never waits on the disk. The writer thread fsyncs the file at most every
+        `FSYNC_INTERVAL` seconds, and once more when closing it, therefore a crash loses at most the
+        last buffer and the last few seconds of writes. Neither `close()` nor the fsyncs ever block the caller.
+    """
+    DIRECTORY = os.path.join("SoundMania", "locals", "replays")
+    EXTENSION = ".smr"
+    BUFFER_SIZE = 16 * 1024
+    FSYNC_INTERVAL = 2.0 # minimum time in seconds between two periodic fsyncs
+
+    _open_writers: ClassVar[set[ReplayWriter]] = set() # writers whose thread hasn't closed the file yet
+
+    def __init__(self, path: str, map_path: str, buffer_size: int = BUFFER_SIZE):
+        self.path = path
+        self.buffer_size = buffer_size
+
+        self._file = open(path, "wb")
+        self._closed = False
+        self._buffer = bytearray(_Record.MAGIC + struct.pack("<H", _Record.VERSION))
+        self._pending: SimpleQueue[bytes | None] = SimpleQueue()
+        self._thread = Thread(target=self._write_loop, name="ReplayWriter", daemon=True)
+        self._open_writers.add(self)
+        self._thread.start()
+
+        encoded_path = map_path.encode("utf-8")
+        self._append(_Record.HEADER, _Record.HEADER_PAYLOAD.pack(unix_time()) + encoded_path)
+
+
+    @classmethod
+    def for_map(cls, map_path: str, directory: str = DIRECTORY) -> ReplayWriter:
+        """ Create a new replay writer with a unique file name in the replay directory. """
+        os.makedirs(directory, exist_ok=True)
+
+        name = os.path.splitext(os.path.basename(os.path.normpath(map_path)))[0]
+        path = os.path.join(directory, f"{name}_{int(unix_time() * 1000)}{cls.EXTENSION}")
+        return cls(path, map_path)
+
+
+    @classmethod
+    def close_all(cls, timeout: float | None = None) -> None:
+        """ Close all open writers and wait for their files to be written out, e.g. when shutting down.
+
+            Args:
+                timeout: maximum time in seconds to wait for each writer
+        """
+        for writer in list(cls._open_writers):
+            writer.close()
+            writer.join(timeout)
+
+
+    @property
+    def closed(self) -> bool:
+        """ Tells whether the writer has been closed. Its file might still be written out in the background. """
+        return self._closed
+
+
+    def record_input(self, time: float, lane: int, pressed: bool) -> None:
+        self._append(_Record.INPUT, _Record.INPUT_PAYLOAD.pack(time, lane, pressed))
+
+
+    def record_judgement(self, result: JudgementResult) -> None:
+        payload = _Record.JUDGEMENT_PAYLOAD.pack(result.lane, result.note, result.time, result.offset, result.judgement, result.release)
+        self._append(_Record.JUDGEMENT, payload)
+
+
+    def close(self) -> None:
+        """ Stop recording. The writer thread writes out the remaining buffer, fsyncs and closes the file in the background. """
+        if self._closed:
+            return
+
+        self._closed = True
+        self._flush_buffer()
+        self._pending.put(None)
+
+
+    def join(self, timeout: float | None = None) -> None:
+        """ Wait for the writer thread to write out and close the file. """
+        self._thread.join(timeout)
+
+
+    def _append(self, record_type: int, payload: bytes) -> None:
+        self._buffer += _Record.PREFIX.pack(len(payload), record_type)
+        self._buffer += payload
+
+        if len(self._buffer) >= self.buffer_size:
+            self._flush_buffer()
+
+
+    def _flush_buffer(self) -> None:
+        if self._buffer:
+            self._pending.put(bytes(self._buffer))
+            self._buffer.clear()
+
+
+    def _write_loop(self) -> None:
+        last_fsync = monotonic()
+        try:
+            while (chunk := self._pending.get()) is not None:
+                self._file.write(chunk)
+                self._file.flush()
+
+                if monotonic() - last_fsync >= self.FSYNC_INTERVAL:
+                    os.fsync(self._file.fileno())
+                    last_fsync = monotonic()
+
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            logger.info(f"Replay saved to '{self.path}'")
+        except OSError as e:
+            logger.error(f"Could not write replay '{self.path}': {e}")
+        finally:
+            self._file.close()
+            self._open_writers.discard(self)
+
+
+class ReplayReader:
+    """ Lazy reader of replay files. Iterating the reader yields the replay records one by one. """
+    def __init__(self, path: str):
+        self.path = path
+        self.header: ReplayHeader | None = None
+
+        with open(path, "rb") as file:
+            self._read_magic(file)
+            record = next(self._read_records(file), None)
+            if isinstance(record, ReplayHeader):
+                self.header = record
+
+
+    def __iter__(self) -> Iterator[ReplayRecord]:
+        with open(self.path, "rb") as file:
+            self._read_magic(file)
+            yield from self._read_records(file)
+
+
+    def judgements(self) -> Iterator[JudgementResult]:
+        return (record for record in self if isinstance(record, JudgementResult))
+
+
+    def _read_magic(self, file: BinaryIO) -> None:
+        magic = file.read(len(_Record.MAGIC) + 2)
+        if magic[:len(_Record.MAGIC)] != _Record.MAGIC:
+            raise ValueError(f"'{self.path}' is not a replay file")
+
+        version, = struct.unpack("<H", magic[len(_Record.MAGIC):])
+        if version != _Record.VERSION:
+            raise ValueError(f"'{self.path}' replay version {version} is not supported")
+
+
+    def _read_records(self, file: BinaryIO) -> Iterator[ReplayRecord]:
+        while True:
+            prefix = file.read(_Record.PREFIX.size)
+            if len(prefix) < _Record.PREFIX.size:
+                return
+
+            length, record_type = _Record.PREFIX.unpack(prefix)
+            payload = file.read(length)
+            if len(payload) < length:
+                logger.warning(f"'{self.path}' replay is truncated")
+                return
+
+            if record_type == _Record.INPUT:
+                yield ReplayInput(*_Record.INPUT_PAYLOAD.unpack(payload))
+            elif record_type == _Record.JUDGEMENT:
+                lane, note, time, offset, judgement, release = _Record.JUDGEMENT_PAYLOAD.unpack(payload)
+                yield JudgementResult(lane, note, time, offset, Judgement(judgement), release)
+            elif record_type == _Record.HEADER:
+                recorded_at, = _Record.HEADER_PAYLOAD.unpack_from(payload)
+                yield ReplayHeader(payload[_Record.HEADER_PAYLOAD.size:].decode("utf-8"), recorded_at)
+            # records of unknown types are skipped, to stay readable by older versions
+
+
+def iter_replays(directory: str = ReplayWriter.DIRECTORY) -> Iterator[ReplayReader]:
+    """ Lazily iterate over all replays in a directory. """
+    if not os.path.isdir(directory):
+        return
+
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith(ReplayWriter.EXTENSION):
+            try:
+                yield ReplayReader(entry.path)
+            except ValueError as e:
+                logger.warning(str(e))
+
+
+def count_judgements(replays: Iterable[ReplayReader]) -> dict[Judgement, int]:
+    """ Count judgements over any number of replays, streaming them one record at a time. """
+    counts = {judgement: 0 for judgement in Judgement}
+    for replay in replays:
+        for result in replay.judgements():
+            counts[result.judgement] += 1
+
+    return counts
+
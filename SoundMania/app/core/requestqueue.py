@@ -1,37 +1,70 @@
-from dataclasses import dataclass
-from typing import Callable
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from time import perf_counter_ns
+from typing import Callable, Hashable
 
 import logging
 logger = logging.getLogger("RequestQueue")
 
 
-@dataclass
+class RequestPriority(IntEnum):
+    """ Priority levels of queued requests. Lower value is processed first. """
+    HIGH   = 0
+    NORMAL = 1
+    LOW    = 2
+
+
+@dataclass(slots=True)
 class _RequestItem:
     callback: Callable
     timeout: int
     preprocess_callback: Callable[[], None] = lambda: None
     postprocess_callback: Callable[[], None] = lambda: None
+    priority: RequestPriority = RequestPriority.NORMAL
+    delay: int = 0
+    queued_at: int = field(default_factory=perf_counter_ns)
+
+
+@dataclass
+class RequestQueueStats:
+    """ Counters describing the RequestQueue throughput. Latencies are given in miliseconds. """
+    queued: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    executed: int = 0
+    latency_total: float = 0
+    latency_max: float = 0
+
+    @property
+    def latency_avg(self) -> float:
+        return self.latency_total / self.executed if self.executed else 0
 
 
 class RequestQueue:
-    def __init__(self, maxsize: int = 100):
+    FRAME_BUDGET = 4 # maximum time spent on processing requests in a single frame in ms
+
+    def __init__(self, maxsize: int = 100, frame_budget: float = FRAME_BUDGET):
         self.maxsize = maxsize
+        self.frame_budget = frame_budget
         self.blocked = False
+        self.stats = RequestQueueStats()
         
-        self._req_queue: list[_RequestItem] = []
+        self._req_queues: tuple[deque[_RequestItem], ...] = tuple(deque() for _ in RequestPriority)
+        self._coalesced: dict[Hashable, _RequestItem] = {}
         self._in_process: _RequestItem | None = None
         self._timeout = 0
 
 
-    def add(self, request: Callable, timeout: int = 0) -> None:
+    def add(self, request: Callable, timeout: int = 0, priority: RequestPriority = RequestPriority.NORMAL) -> None:
         """ Create and push a new request to the queue from a callable. """
         if timeout < 0:
             raise ValueError("Request timeout duration cannot be negative.")
         
-        self._push_request(_RequestItem(request, timeout))
+        self._push_request(_RequestItem(request, timeout, priority=priority))
         
     
-    def add_blocking(self, request: Callable, timeout: int) -> None:
+    def add_blocking(self, request: Callable, timeout: int, priority: RequestPriority = RequestPriority.NORMAL) -> None:
         """ Create and push a new blocking request to the queue from a callable. 
         
             For the duration of the request being processed, RequestQueue will block any incoming requests. 
@@ -42,39 +75,107 @@ class RequestQueue:
         preprocessor = lambda: setattr(self, "blocked", True)
         postprocessor = lambda: setattr(self, "blocked", False)
         
-        self._push_request(_RequestItem(request, timeout, preprocessor, postprocessor))
+        self._push_request(_RequestItem(request, timeout, preprocessor, postprocessor, priority))
+
+
+    def add_coalesced(self, key: Hashable, request: Callable, delay: int, priority: RequestPriority = RequestPriority.NORMAL) -> None:
+        """ Create a new request, coalesced with other requests of the same kind.
+
+            The request is pushed to the queue only after `delay` miliseconds have passed without
+            any other request being added under the same `key`. Any request still waiting under
+            that `key` is replaced, so only the latest one is ever processed. A request settling while
+            the queue is blocked is held back until the queue unblocks.
+
+            Args:
+                key: kind of the request
+                request: the callable to be processed
+                delay: settle time in miliseconds
+        """
+        if delay < 0:
+            raise ValueError("Request delay duration cannot be negative.")
+
+        if key in self._coalesced:
+            self.stats.coalesced += 1
+
+        self._coalesced[key] = _RequestItem(request, 0, priority=priority, delay=delay)
         
         
     def process(self, dt: int) -> None:
-        """ Process the next request in queue. 
+        """ Process as many queued requests as fit in the frame budget.
+
+            Requests are taken in priority order, and in insertion order within the same priority.
+            A request with a timeout stops the processing until its timeout runs out.
         
             Args:
                 dt: elapsed time since the last frame 
         """
+        if self._coalesced:
+            self._process_coalesced(dt)
+
         if self._timeout > 0:
             self._timeout -= dt
-        else:
-            if self._in_process:
-                self._in_process.postprocess_callback()
-                self._in_process = None
-                
-            if self._req_queue:
-                request = self._req_queue.pop(0)
-                request.preprocess_callback()
-                request.callback()
-                
+            return
+        
+        if self._in_process:
+            self._in_process.postprocess_callback()
+            self._in_process = None
+        
+        deadline = perf_counter_ns() + self.frame_budget * 1_000_000
+        while perf_counter_ns() < deadline:
+            request = self._pop_request()
+            if request is None:
+                break
+
+            self._execute(request)
+            if request.timeout > 0:
                 self._timeout = request.timeout
                 self._in_process = request
+                break
+
+            request.postprocess_callback()
+
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._req_queues)
+
+
+    def _execute(self, request: _RequestItem) -> None:
+        latency = (perf_counter_ns() - request.queued_at) / 1_000_000
+        self.stats.executed += 1
+        self.stats.latency_total += latency
+        self.stats.latency_max = max(self.stats.latency_max, latency)
+
+        request.preprocess_callback()
+        request.callback()
+
+
+    def _process_coalesced(self, dt: int) -> None:
+        for key, request in list(self._coalesced.items()):
+            request.delay -= dt
+            if request.delay <= 0 and not self.blocked: # a settled request waits for the queue to unblock instead of being dropped
+                del self._coalesced[key]
+                request.queued_at = perf_counter_ns()
+                self._push_request(request)
+
+
+    def _pop_request(self) -> _RequestItem | None:
+        for queue in self._req_queues:
+            if queue:
+                return queue.popleft()
+        return None
             
             
     def _push_request(self, request: _RequestItem) -> None:
-        if len(self._req_queue) >= self.maxsize:
+        if len(self) >= self.maxsize:
+            self.stats.dropped += 1
             logger.critical("Queue is full. An incoming request has been ignored")
             return
         
         if self.blocked:
+            self.stats.dropped += 1
             logger.debug("An incoming request has been blocked")
             return
         
-        self._req_queue.append(request)
+        self.stats.queued += 1
+        self._req_queues[request.priority].append(request)
         
\ No newline at end of file
@@ -0,0 +1,142 @@
+from dataclasses import dataclass, field
+from math import sqrt
+from time import perf_counter_ns
+from typing import Callable
+
+
+@dataclass
+class SongClockStats:
+    """ Running statistics of the error between the predicted song position and the audio position samples, in miliseconds. """
+    samples: int = 0
+    snaps: int = 0
+    error_mean: float = 0
+    error_max: float = 0
+    _error_m2: float = field(default=0, repr=False)
+
+    @property
+    def error_stdev(self) -> float:
+        return sqrt(self._error_m2 / (self.samples - 1)) if self.samples > 1 else 0
+
+
+    def add(self, error: float) -> None:
+        self.samples += 1
+        delta = error - self.error_mean
+        self.error_mean += delta / self.samples
+        self._error_m2 += delta * (error - self.error_mean)
+        self.error_max = max(self.error_max, abs(error))
+
+
+class SongClock:
+    """ Class responsible for providing a smooth, high-precision song position.
+
+        Audio position samples, like `pygame.mixer.music.get_pos()`, are coarse and only change once every
+        audio buffer. SongClock extrapolates the position between the samples with a high-resolution timer,
+        and slowly steers the extrapolation towards new samples, so the position never jumps nor goes back.
+    """
+    SNAP_THRESHOLD = 100 # error in ms above which the clock is snapped to the sample instead of being steered
+    CORRECTION_GAIN = 0.1
+
+    def __init__(self, source: Callable[[], float], latency: float = 0, time_source: Callable[[], int] = perf_counter_ns):
+        """ Make a new song clock.
+
+            Args:
+                source: callable returning the current audio position in miliseconds, or a negative value when stopped
+                latency: audio output latency in miliseconds, subtracted from the reported position
+                time_source: high-resolution timer returning nanoseconds
+        """
+        self.source = source
+        self.latency = latency
+        self.time_source = time_source
+        self.stats = SongClockStats()
+
+        self._playing = False
+        self._anchor_position = 0.0
+        self._anchor_time = 0
+        self._source_offset = 0.0
+        self._last_sample: float | None = None
+        self._last_position = float("-inf")
+
+
+    @property
+    def playing(self) -> bool:
+        return self._playing
+
+
+    @property
+    def position(self) -> float:
+        """ Latency-compensated song position in miliseconds. Never decreases, unless the clock is started or seeked. """
+        position = self._extrapolate(self.time_source()) - self.latency
+        if position < self._last_position:
+            return self._last_position
+
+        self._last_position = position
+        return position
+
+
+    def start(self, position: float = 0) -> None:
+        """ Notify the clock that the playback was (re)started from `position`, with the source counting from zero. """
+        self._source_offset = position
+        self._reset(position)
+        self._playing = True
+
+
+    def seek(self, position: float) -> None:
+        """ Notify the clock that the playback was moved to `position`, while the source kept counting. """
+        sample = self.source()
+        self._source_offset = position - max(sample, 0)
+        self._reset(position)
+
+
+    def pause(self) -> None:
+        if self._playing:
+            self._anchor_position = self._extrapolate(self.time_source())
+            self._playing = False
+
+
+    def resume(self) -> None:
+        if not self._playing:
+            self._anchor_time = self.time_source()
+            self._playing = True
+
+
+    def stop(self) -> None:
+        self._playing = False
+        self._reset(0)
+
+
+    def update(self) -> None:
+        """ Take a new sample from the source, and steer the clock towards it. Should be called once a frame. """
+        if not self._playing:
+            return
+
+        sample = self.source()
+        if sample < 0 or sample == self._last_sample:
+            return # no new information since the last sample
+        self._last_sample = sample
+
+        now = self.time_source()
+        predicted = self._extrapolate(now)
+        error = sample + self._source_offset - predicted
+        self.stats.add(error)
+
+        if abs(error) > self.SNAP_THRESHOLD:
+            self.stats.snaps += 1
+            self._anchor_position = predicted + error
+        else:
+            self._anchor_position = predicted + error * self.CORRECTION_GAIN
+        self._anchor_time = now
+
+
+    def _extrapolate(self, now: int) -> float:
+        if not self._playing:
+            return self._anchor_position
+
+        return self._anchor_position + (now - self._anchor_time) / 1_000_000
+
+
+    def _reset(self, position: float) -> None:
+        self._anchor_position = position
+        self._anchor_time = self.time_source()
+        self._last_sample = None
+        self._last_position = float("-inf")
+
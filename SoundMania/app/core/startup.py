@@ -0,0 +1,151 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from importlib.abc import MetaPathFinder
+from time import perf_counter
+import sys
+
+import logging
+logger = logging.getLogger("Startup")
+
+
+@dataclass
+class _ImportRecord:
+    name: str
+    self_time: float = 0   # time in ms spent executing just the module body
+    cumulative: float = 0  # time in ms including the nested imports
+    stage: int = 0         # index of the startup stage the module was imported in
+
+
+class ImportTimer(MetaPathFinder):
+    """ Meta path finder measuring how long each module takes to import, like `python -X importtime`.
+
+        The finder doesn't locate modules itself. It asks the remaining finders for the module spec,
+        and wraps the spec loader to time the module execution.
+    """
+    def __init__(self):
+        self.records: list[_ImportRecord] = []
+        self.stage = 0
+        self._stack: list[_ImportRecord] = []
+
+
+    def install(self) -> None:
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(self, spec.loader)
+                return spec
+
+        return None
+
+
+    def _exec_module(self, loader, module) -> None:
+        record = _ImportRecord(module.__name__, stage=self.stage)
+        self.records.append(record)
+        self._stack.append(record)
+
+        start = perf_counter()
+        try:
+            loader.exec_module(module)
+        finally:
+            record.cumulative = (perf_counter() - start) * 1000
+            self._stack.pop()
+            record.self_time += record.cumulative
+            if self._stack:
+                self._stack[-1].self_time -= record.cumulative
+
+
+class _TimedLoader:
+    def __init__(self, timer: ImportTimer, loader):
+        self._timer = timer
+        self._loader = loader
+
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+
+    def exec_module(self, module) -> None:
+        self._timer._exec_module(self._loader, module)
+
+
+    def __getattr__(self, name: str):
+        return getattr(self._loader, name)
+
+
+@dataclass
+class StartupTimeline:
+    """ Record of the application startup stages.
+
+        Stage times are measured from the creation of the timeline, which should happen as early as possible.
+        When import tracing is enabled, every module imported during the startup is timed and attributed to
+        the stage it was imported in.
+    """
+    trace_imports: bool = False
+    start: float = field(default_factory=perf_counter)
+    stages: list[tuple[str, float]] = field(default_factory=list) # stage name, time in ms since start the stage has ended at
+    import_timer: ImportTimer | None = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.trace_imports:
+            self.import_timer = ImportTimer()
+            self.import_timer.install()
+
+
+    @property
+    def elapsed(self) -> float:
+        """ Time in ms since the start of the timeline. """
+        return (perf_counter() - self.start) * 1000
+
+
+    def mark(self, stage: str) -> None:
+        """ Mark the end of a startup stage. Imports made from now on are attributed to the next stage. """
+        self.stages.append((stage, self.elapsed))
+        if self.import_timer:
+            self.import_timer.stage = len(self.stages)
+
+
+    def finish(self, target: float | None = None) -> None:
+        """ Stop tracing imports and log the timeline.
+
+            Args:
+                target: cold start time budget in ms, a warning is logged when it was exceeded
+        """
+        if self.import_timer:
+            self.import_timer.uninstall()
+
+        logger.info(self.format())
+        total = self.stages[-1][1] if self.stages else 0
+        if target is not None and total > target:
+            logger.warning(f"Startup took {total:.0f}ms, exceeding the {target:.0f}ms target")
+
+
+    def format(self, top: int = 15) -> str:
+        """ Format the timeline as a table, followed by the `top` slowest imports when import tracing is enabled. """
+        lines = ["Startup timeline:", f"{'stage':<24} {'duration':>10} {'at':>10}"]
+        last = 0.0
+        for stage, end in self.stages:
+            lines.append(f"{stage:<24} {end - last:>8.1f}ms {end:>8.1f}ms")
+            last = end
+
+        if self.import_timer and self.import_timer.records:
+            lines.append(f"Slowest imports ({len(self.import_timer.records)} modules imported):")
+            lines.append(f"{'self':>10} | {'cumulative':>10} | {'stage':<20} | module")
+            for record in sorted(self.import_timer.records, key=lambda r: r.cumulative, reverse=True)[:top]:
+                stage = self.stages[record.stage][0] if record.stage < len(self.stages) else "-"
+                lines.append(f"{record.self_time:>8.1f}ms | {record.cumulative:>8.1f}ms | {stage:<20} | {record.name}")
+
+        return "\n".join(lines)
@@ -0,0 +1,191 @@
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from queue import SimpleQueue, Empty
+from typing import Any, Callable, Literal
+
+import logging
+logger = logging.getLogger("TaskScheduler")
+
+
+_PoolKind = Literal["thread", "process"]
+
+
+@dataclass
+class _TaskItem:
+    future: Future
+    fn: Callable
+    args: tuple
+    callback: Callable[[Any], None] | None
+    pool: _PoolKind
+    inner: Future | None = field(default=None)
+
+
+class TaskScheduler:
+    """ Class responsible for running expensive work outside of the main loop.
+
+        Tasks are executed in a thread or process pool, while their futures are
+        resolved, and their callbacks are called, from within `process()` on the main loop.
+
+        Each pool has its own limit of tasks in flight and its own queue of pending tasks, so a busy
+        process pool never holds back the thread pool tasks, and the other way around. Pending queues
+        are bounded: once one is full, its oldest task is cancelled to make room for the new one,
+        as the most recently submitted work is the most relevant to what's on screen.
+    """
+    MAX_IN_FLIGHT = 4
+    MAX_PROCESSES_IN_FLIGHT = 2
+    MAX_PENDING = 256 # maximum number of pending tasks per pool
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, max_processes_in_flight: int = MAX_PROCESSES_IN_FLIGHT, max_pending: int = MAX_PENDING):
+        """ Make a new task scheduler.
+
+            Args:
+                max_in_flight: maximum number of tasks running at once in the thread pool
+                max_processes_in_flight: maximum number of tasks running at once in the process pool
+                max_pending: maximum number of tasks waiting for each pool
+        """
+        if max_in_flight <= 0 or max_processes_in_flight <= 0:
+            raise ValueError("Maximum number of tasks in flight must be greater than 0.")
+        if max_pending <= 0:
+            raise ValueError("Maximum number of pending tasks must be greater than 0.")
+
+        self.max_in_flight: dict[_PoolKind, int] = {"thread": max_in_flight, "process": max_processes_in_flight}
+        self.max_pending = max_pending
+
+        self._executors: dict[_PoolKind, Executor] = {}
+        self._pending: dict[_PoolKind, deque[_TaskItem]] = {"thread": deque(), "process": deque()}
+        self._in_flight: dict[_PoolKind, int] = {"thread": 0, "process": 0}
+        self._completed: SimpleQueue[_TaskItem] = SimpleQueue()
+
+
+    def submit(self, fn: Callable, *args: Any, callback: Callable[[Any], None] | None = None, pool: _PoolKind = "thread") -> Future:
+        """ Schedule `fn(*args)` to be run in a worker pool.
+
+            Args:
+                fn: callable to be executed. Must be picklable when run in the process pool
+                callback: optional callable called on the main loop with the task result
+                pool: kind of the pool the task is executed in, either "thread" or "process"
+
+            Returns:
+                a Future object resolved on the main loop once the task has finished
+        """
+        if pool not in ("thread", "process"):
+            raise ValueError(f"invalid pool kind '{pool}'")
+
+        pending = self._pending[pool]
+        if len(pending) >= self.max_pending:
+            dropped = pending.popleft()
+            dropped.future.cancel()
+            logger.warning(f"Too many pending {pool} pool tasks, task {getattr(dropped.fn, '__name__', dropped.fn)} has been cancelled")
+
+        item = _TaskItem(Future(), fn, args, callback, pool)
+        pending.append(item)
+        self._fill_slots(pool)
+        return item.future
+
+
+    def cancel(self, future: Future) -> bool:
+        """ Cancel a submitted task.
+
+            A pending task is never started. An already running task can't be interrupted,
+            but its result is discarded and its callback is never called.
+        """
+        for pending in self._pending.values():
+            for item in pending:
+                if item.future is future:
+                    pending.remove(item)
+                    break
+
+        return future.cancel()
+
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._in_flight.values())
+
+
+    def __len__(self) -> int:
+        return self.in_flight + sum(len(pending) for pending in self._pending.values())
+
+
+    def process(self, dt: int) -> None:
+        """ Resolve finished tasks and start pending ones.
+
+            Args:
+                dt: elapsed time since the last frame
+        """
+        while True:
+            try:
+                item = self._completed.get_nowait()
+            except Empty:
+                break
+
+            self._in_flight[item.pool] -= 1
+            self._resolve(item)
+
+        for pool in self._pending:
+            self._fill_slots(pool)
+
+
+    def shutdown(self) -> None:
+        """ Cancel all pending tasks and shut down the worker pools. """
+        for pending in self._pending.values():
+            while pending:
+                pending.popleft().future.cancel()
+
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors.clear()
+
+
+    def _fill_slots(self, pool: _PoolKind) -> None:
+        pending = self._pending[pool]
+        while pending and self._in_flight[pool] < self.max_in_flight[pool]:
+            item = pending.popleft()
+            if item.future.cancelled():
+                continue
+
+            item.inner = self._get_executor(pool).submit(item.fn, *item.args)
+            item.inner.add_done_callback(partial(self._on_inner_done, item))
+            self._in_flight[pool] += 1
+
+
+    def _on_inner_done(self, item: _TaskItem, _: Future) -> None:
+        """ Called on a worker thread, hands the finished task over to the main loop. """
+        self._completed.put(item)
+
+
+    def _resolve(self, item: _TaskItem) -> None:
+        assert item.inner is not None
+        if item.future.cancelled() or item.inner.cancelled():
+            item.future.cancel()
+            return
+
+        exc = item.inner.exception()
+        if exc is not None:
+            logger.error(f"Task {getattr(item.fn, '__name__', item.fn)} has failed: {exc!r}")
+            item.future.set_exception(exc)
+            return
+
+        result = item.inner.result()
+        item.future.set_result(result)
+        if item.callback:
+            try:
+                item.callback(result)
+            except Exception as e: # a failing callback must not take the main loop down with it
+                logger.exception(f"Callback of task {getattr(item.fn, '__name__', item.fn)} has failed: {e!r}")
+
+
+    def _get_executor(self, pool: _PoolKind) -> Executor:
+        executor = self._executors.get(pool)
+        if executor is None:
+            if pool == "thread":
+                executor = ThreadPoolExecutor(self.max_in_flight[pool], thread_name_prefix="TaskScheduler")
+            else:
+                from concurrent.futures import ProcessPoolExecutor # imports multiprocessing, only needed by process pool tasks
+                executor = ProcessPoolExecutor(self.max_in_flight[pool])
+            self._executors[pool] = executor
+
+        return executor
+
@@ -0,0 +1,156 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import partial
+import hashlib
+import io
+import os
+
+import pygame
+
+from core.taskscheduler import TaskScheduler
+
+import logging
+logger = logging.getLogger("Thumbnails")
+
+
+COVER_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+COVER_NAMES = ("cover", "thumbnail", "bg", "background") # preferred cover file names, in the order of preference
+
+
+def find_cover(map_path: str) -> str | None:
+    """ Return the path to the cover image of a map, or `None` when the map has no cover. """
+    try:
+        images = [p for p in os.listdir(map_path) if p.lower().endswith(COVER_EXTENSIONS)]
+    except FileNotFoundError:
+        return None
+
+    if not images:
+        return None
+
+    def preference(name: str) -> tuple[int, str]:
+        stem = os.path.splitext(name)[0].lower()
+        return (COVER_NAMES.index(stem) if stem in COVER_NAMES else len(COVER_NAMES), name)
+
+    return os.path.join(map_path, min(images, key=preference))
+
+
+def make_thumbnail(map_path: str, size: tuple[int, int], cache_dir: str) -> pygame.surface.Surface | None:
+    """ Find the cover of a map and scale it to a thumbnail, cached on disk under a hash of the cover content and size.
+
+        Runs on a worker thread. Image decoding and scaling release the GIL, and only touch plain software
+        surfaces, so neither the display nor the main loop are involved.
+
+        Returns:
+            the thumbnail surface, or `None` when the map has no usable cover
+    """
+    cover_path = find_cover(map_path)
+    if cover_path is None:
+        return None
+
+    with open(cover_path, "rb") as file:
+        content = file.read()
+
+    digest = hashlib.sha1(content)
+    digest.update(f"{size[0]}x{size[1]}".encode())
+    thumbnail_path = os.path.join(cache_dir, f"{digest.hexdigest()}.png")
+
+    try:
+        if os.path.isfile(thumbnail_path):
+            thumbnail = pygame.image.load(thumbnail_path)
+        else:
+            thumbnail = _scale_to_fill(pygame.image.load(io.BytesIO(content), os.path.basename(cover_path)), size)
+            tmp_path = thumbnail_path + ".tmp.png"
+            pygame.image.save(thumbnail, tmp_path)
+            os.replace(tmp_path, thumbnail_path)
+    except pygame.error as e:
+        logger.warning(f"Could not make a thumbnail of '{cover_path}': {e}")
+        return None
+
+    return thumbnail
+
+
+def _scale_to_fill(image: pygame.surface.Surface, size: tuple[int, int]) -> pygame.surface.Surface:
+    """ Scale an image to cover `size` while keeping its aspect ratio, cropping the overflow evenly from both sides. """
+    width, height = image.get_size()
+    if image.get_bitsize() < 24: # smoothscale only works with 24 and 32 bit surfaces
+        converted = pygame.surface.Surface((width, height), 0, 32)
+        converted.blit(image, (0, 0))
+        image = converted
+
+    scale = max(size[0] / width, size[1] / height)
+    scaled = pygame.transform.smoothscale(image, (max(round(width * scale), size[0]), max(round(height * scale), size[1])))
+
+    x, y = (scaled.get_width() - size[0]) // 2, (scaled.get_height() - size[1]) // 2
+    return scaled.subsurface((x, y, *size)).copy()
+
+
+class ThumbnailCache:
+    """ Class responsible for providing map cover thumbnails without blocking the main loop.
+
+        Thumbnails are made by `make_thumbnail` in the task scheduler thread pool and kept on disk in a
+        content-addressed cache. Only the surfaces of recently requested thumbnails are kept in memory,
+        so `max_surfaces` should cover at least all thumbnails on screen at once.
+    """
+    DIRECTORY = os.path.join("SoundMania", "locals", "cache", "thumbnails")
+    MAX_SURFACES = 64
+
+    def __init__(self, task_scheduler: TaskScheduler, directory: str = DIRECTORY, max_surfaces: int = MAX_SURFACES):
+        self.task_scheduler = task_scheduler
+        self.directory = directory
+        self.max_surfaces = max_surfaces
+
+        os.makedirs(directory, exist_ok=True)
+        self._surfaces: OrderedDict[tuple[str, tuple[int, int]], pygame.surface.Surface] = OrderedDict()
+        self._pending: set[tuple[str, tuple[int, int]]] = set()
+        self._missing: set[str] = set() # maps without a usable cover
+        self._arrivals: list[str] = [] # maps whose thumbnails became available since the last `pop_arrivals()`
+
+
+    def get(self, map_path: str, size: tuple[int, int]) -> pygame.surface.Surface | None:
+        """ Return the thumbnail of a map, or `None` when the map has no cover or its thumbnail isn't ready yet.
+
+            A thumbnail which isn't ready yet is requested, and its map is listed by `pop_arrivals()` once it's available.
+        """
+        key = (map_path, size)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            return surface
+
+        self.prefetch(map_path, size)
+        return None
+
+
+    def prefetch(self, map_path: str, size: tuple[int, int]) -> None:
+        """ Request the thumbnail of a map to be made in the background, unless it's already available. """
+        key = (map_path, size)
+        if key in self._surfaces or key in self._pending or map_path in self._missing:
+            return
+
+        self._pending.add(key)
+        future = self.task_scheduler.submit(make_thumbnail, map_path, size, self.directory, callback=partial(self._on_thumbnail, key))
+        future.add_done_callback(partial(self._on_done, key))
+
+
+    def pop_arrivals(self) -> list[str]:
+        """ Return the paths of the maps whose thumbnails became available since the last call. """
+        arrivals, self._arrivals = self._arrivals, []
+        return arrivals
+
+
+    def _on_done(self, key: tuple[str, tuple[int, int]], future: Future) -> None:
+        self._pending.discard(key)
+        if not future.cancelled() and future.exception() is not None:
+            self._missing.add(key[0])
+
+
+    def _on_thumbnail(self, key: tuple[str, tuple[int, int]], thumbnail: pygame.surface.Surface | None) -> None:
+        if thumbnail is None:
+            self._missing.add(key[0])
+            return
+
+        self._surfaces[key] = thumbnail.convert()
+        while len(self._surfaces) > self.max_surfaces:
+            self._surfaces.popitem(last=False)
+
+        self._arrivals.append(key[0])
@@ -1,6 +1,8 @@
 from __future__ import annotations
+from collections import OrderedDict, deque
 from math import cos, sin, radians
-from functools import cache
+from time import perf_counter
+from typing import Callable, Iterable, Literal, TypedDict
 
 import logging
 logger = logging.getLogger("ViewManager")
@@ -11,12 +13,40 @@ import soundmania
 import view
 
 
+class _BackgroundState(TypedDict):
+    visible: bool
+    surface: pygame.surface.Surface
+    color_back: tuple[int, int, int]
+    color_front: tuple[int, int, int]
+    should_update: bool
+    animation_duration: int
+    animation_time_elapsed: float
+
+
+class _TransitionState(TypedDict):
+    visible: bool
+    surface: pygame.surface.Surface
+    callback: Callable[[int], None]
+    time_elapsed: int
+    overlay_alpha: int
+    overlay_color: tuple[int, int, int]
+
+
 class ViewManager:
     """ Class responsible for rendering and managing views. """
     NO_OP = lambda *args, **kwargs: None
+    MAX_RESIDENT_VIEWS = 4
+    RESIZE_DEBOUNCE = 150 # time in ms the window size has to settle for, before the view gets relaid out
+    IDLE_DELAY = 500 # time in ms without any input, transition or queued request, before a prewarmed view gets constructed
     
-    def __init__(self):
-        self._background = {
+    def __init__(self, max_resident_views: int = MAX_RESIDENT_VIEWS):
+        self.max_resident_views = max_resident_views
+        self.construction_times: dict[str, float] = {} # view construction durations in ms
+        self._views: OrderedDict[type[view.View], view.View] = OrderedDict()
+        self._prewarm_queue: deque[tuple[type[view.View], soundmania.SoundMania]] = deque() # views waiting for idle time
+        self._idle_time = 0
+        
+        self._background: _BackgroundState = {
             "visible": False,
             "surface": self._get_display_surface_copy(),
             "color_back": (167, 0, 29),
@@ -26,7 +56,7 @@ class ViewManager:
             "animation_time_elapsed": 0
         }
         
-        self._transition = {
+        self._transition: _TransitionState = {
             "visible": False,
             "surface": self._get_display_surface_copy(),
             "callback": self.NO_OP,
@@ -34,6 +64,10 @@ class ViewManager:
             "overlay_alpha": 0,
             "overlay_color": (26, 12, 12)
         }
+        
+        self._resize_pending = False
+        self._resize_snapshot: pygame.surface.Surface | None = None # last frame, shown while the window size settles
+        self._resize_elapsed = 0
     
     
     def get_current_view(self) -> view.View:
@@ -43,11 +77,45 @@ class ViewManager:
             raise RuntimeError(f"ViewManager was not initialized with a view. Be sure to call `ViewManager.set_view()` first")
     
         
-    @cache
     def get_view(self, view: type[view.View], root: soundmania.SoundMania) -> view.View:
-        """ Cached getter of view objects. """
-        logger.debug(f"Initializing view {view.__name__}")
-        return view(root)
+        """ Cached getter of view objects. 
+        
+            Views are kept resident up to `self.max_resident_views`, after which the least 
+            recently used view, other than the current one, gets evicted.
+        """
+        instance = self._views.get(view)
+        if instance is None:
+            instance = self._construct_view(view, root)
+            self._store_view(instance)
+        else:
+            self._views.move_to_end(view)
+            
+        return instance
+    
+    
+    def prewarm(self, views: Iterable[type[view.View]], root: soundmania.SoundMania, mode: Literal["startup", "idle"] = "idle") -> None:
+        """ Construct views ahead of them being first displayed.
+        
+            Views are always constructed on the main thread, as they create pygame surfaces and fonts.
+            
+            Args:
+                views: view types to be constructed
+                root: root application object
+                mode: "startup" constructs the views right away, while "idle" constructs them one at a time,
+                    each once the application has been idle for `IDLE_DELAY` ms. A view displayed before 
+                    its idle construction is simply constructed on demand.
+        """
+        if mode not in ("startup", "idle"):
+            raise ValueError(f"invalid prewarm mode '{mode}'")
+            
+        for view_type in views:
+            if view_type in self._views:
+                continue
+            
+            if mode == "startup":
+                self.get_view(view_type, root)
+            else:
+                self._prewarm_queue.append((view_type, root))
     
     
     def set_view(self, view: type[view.View], root: soundmania.SoundMania) -> None:
@@ -99,12 +167,13 @@ class ViewManager:
     def handle_events(self, event_list: list[pygame.event.Event]) -> None:
         current_view = self.get_current_view()
         
+        if event_list:
+            self._idle_time = 0
+            
         unhandled = []
         for event in event_list:
             if event.type == pygame.VIDEORESIZE:
-                self._transition["surface"] = self._get_display_surface_copy()
-                self._background["surface"] = self._get_display_surface_copy()
-                current_view.on_window_resize()
+                self._resize_begin()
             else:
                 unhandled.append(event)
                 
@@ -122,11 +191,17 @@ class ViewManager:
                 self._background_update(dt)
             self._background["should_update"] = not self._background["should_update"] # background is being updated every 2 frames
         
+        if self._resize_pending:
+            self._resize_update(dt)
+        
         current_view = self.get_current_view()
         current_view.update(dt)
         
         self._transition_update(dt)
         
+        if self._prewarm_queue:
+            self._prewarm_update(dt)
+        
         
     def render(self, surface: pygame.surface.Surface) -> None:
         """ Draw the view on screen, along with all requested overlays and backgrounds.
@@ -134,6 +209,12 @@ class ViewManager:
             Args:
                 surface: display surface
         """
+        if self._resize_pending:
+            # cheap preview of the last frame, shown until the window size settles
+            assert self._resize_snapshot is not None
+            surface.blit(pygame.transform.scale(self._resize_snapshot, surface.get_size()), (0,0))
+            return
+        
         if self._background["visible"]:
             surface.blit(self._background["surface"], (0,0))
         
@@ -177,10 +258,74 @@ class ViewManager:
             pygame.draw.polygon(bgs, self._background["color_front"], (start_l, end_l, end_r, start_r))  
     
     
+    def _resize_begin(self) -> None:
+        if not self._resize_pending:
+            self._resize_pending = True
+            self._resize_snapshot = self._get_display_surface_copy()
+            
+        self._resize_elapsed = 0
+        
+        
+    def _resize_update(self, dt: int) -> None:
+        self._resize_elapsed += dt
+        if self._resize_elapsed < self.RESIZE_DEBOUNCE:
+            return
+        
+        self._resize_pending = False
+        self._resize_snapshot = None
+        
+        self._transition["surface"] = self._get_display_surface_copy()
+        self._background["surface"] = self._get_display_surface_copy()
+        self.get_current_view().on_window_resize()
+        
+    
     def _transition_update(self, dt: int) -> None:
         callback = self._transition["callback"]
         callback(dt)
         
+        
+    def _prewarm_update(self, dt: int) -> None:
+        """ Construct the next prewarmed view, once nothing has happened for `IDLE_DELAY` ms. """
+        view_type, root = self._prewarm_queue[0]
+        request_queue = root.request_queue
+        if self._transition["callback"] != self.NO_OP or self._resize_pending or len(request_queue) or request_queue.blocked:
+            self._idle_time = 0
+            return
+        
+        self._idle_time += dt
+        if self._idle_time < self.IDLE_DELAY:
+            return
+        
+        self._prewarm_queue.popleft()
+        self._idle_time = 0 # construct at most one view per idle period
+        if view_type not in self._views:
+            self.get_view(view_type, root)
+        
+    
+    def _construct_view(self, view: type[view.View], root: soundmania.SoundMania) -> view.View:
+        start = perf_counter()
+        instance = view(root)
+        
+        elapsed = (perf_counter() - start) * 1000
+        self.construction_times[view.__name__] = elapsed
+        logger.info(f"View {view.__name__} constructed in {elapsed:.1f}ms")
+        return instance
+    
+    
+    def _store_view(self, instance: view.View) -> None:
+        view_type = type(instance)
+        self._views[view_type] = instance
+        
+        # neither the current view nor the new one, about to become current, are ever evicted
+        current = getattr(self, "_current_view", None)
+        for resident in list(self._views):
+            if len(self._views) <= self.max_resident_views:
+                break
+            
+            if resident is not view_type and self._views[resident] is not current:
+                logger.debug(f"Evicting view {resident.__name__}")
+                del self._views[resident]
+    
     
     def _get_display_surface_copy(self) -> pygame.surface.Surface:
         return pygame.display.get_surface().copy()
@@ -1,40 +1,101 @@
+from __future__ import annotations
 from functools import partial
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 
 import pygame
 
 from core.input.inputmanager import InputManager
 from core.requestqueue import RequestQueue
+from core.taskscheduler import TaskScheduler
 from core.viewmanager import ViewManager
-from core.mapmanager import MapManager
+from core.mapmanager import MapInfo, MapManager
+from core.songclock import SongClock
 from core.configio import ConfigIO
+from core.audioconfig import AudioConfig
+from core.audiocache import AudioCache
+from core.thumbnails import ThumbnailCache
+from core.chart import ChartCompiler, ChartSyntaxError
+from core.startup import StartupTimeline
+from core.profiler import FrameProfiler
 
 import view  # import just the module name to avoid circular import
 
+if TYPE_CHECKING:
+    from core.libraryanalyzer import LibraryAnalyzer
+
+import logging
+logger = logging.getLogger("SoundMania")
+
 
 class SoundMania:
     """ Root application class responsible for handling communication between views and managers. """
     WINDOW_WIDTH: int  = 1600
     WINDOW_HEIGHT: int = 900
+    STARTUP_TARGET: int = 1000 # cold start time budget in ms, from the launch to the first view
+    PROFILER_HOTKEY: int = pygame.K_F12
+    REPLAY_CLOSE_TIMEOUT: float = 5 # maximum time in seconds to wait for each open replay to be written out on shutdown
     
-    def __init__(self):
-        pygame.init()
+    def __init__(self, timeline: StartupTimeline | None = None):
+        """ Initialise the application in stages, showing the window as soon as possible.
+        
+            Only the pygame subsystems used by the application are initialised.
+        
+            Args:
+                timeline: startup timeline to record the initialisation stages in, created when not given
+        """
+        self.timeline = timeline or StartupTimeline()
+        
+        pygame.display.init()
         self.display_surface = self._get_display()
-        self.clock = pygame.time.Clock()
+        self._show_first_frame()
+        self.timeline.mark("display")
         
         self.config = ConfigIO()
+        pygame.font.init()
+        self.audio_config = AudioConfig.from_config(self.config)
+        self.audio_config.init()
+        self.timeline.mark("font and audio")
+        
+        self.clock = pygame.time.Clock()
         md = self.config.get_user_map_directory()
+        self.song_preview_delay = self.config.get_song_preview_delay()
         
         self.request_queue = RequestQueue()
+        self.task_scheduler = TaskScheduler()
+        self.audio_cache = AudioCache(self.task_scheduler, self.config.get_audio_cache_budget())
+        self.thumbnails = ThumbnailCache(self.task_scheduler)
+        self.profiler = FrameProfiler(self.task_scheduler, self.config.get_profile_frames())
         self.input_manager = InputManager()
         self.view_manager = ViewManager()
-        self.map_manager = MapManager(md)
+        ordering = self.config["map_ordering"]
+        self.map_manager = MapManager(md, ordering if ordering in MapManager.ORDERINGS else "title") # type: ignore
+        self.map_manager.scan(self.task_scheduler)
+        self.task_scheduler.submit(self._load_library_analyzer, callback=lambda analyzer: self.map_manager.set_map_stats(analyzer.index))
+        self.audio_device = self.config["audio_device"]
+        self.input_offsets = {device: self.config.get_calibration_offset("input", device) for device in ("keyboard", "controller")}
+        audio_offset = self.config.get_calibration_offset("audio", self.audio_device)
+        self.song_clock = SongClock(pygame.mixer.music.get_pos, latency=audio_offset)
         
+        self._sounds: dict[str, pygame.mixer.Sound] = {}
+        self.timeline.mark("managers")
         
+        
+    def _load_library_analyzer(self) -> LibraryAnalyzer:
+        """ Import and create the library analyzer on a worker thread, keeping its imports off the startup path. """
+        from core.libraryanalyzer import LibraryAnalyzer
+        return LibraryAnalyzer(self.map_manager)
+
+
     def run(self) -> None:
         """ Set up and run the application. """
         self.view_manager.set_view(view.MainMenuView, root=self)
+        self.timeline.mark("first view")
+        self.timeline.finish(target=self.STARTUP_TARGET)
+        
+        self.view_manager.prewarm((view.MapIndexView, view.UserSettingsView), root=self, mode="idle")
         self.running = True
+        if self.config["profile_on_start"].lower() in ("1", "true", "yes", "on"):
+            self.profiler.start()
         
         self._mainloop()
     
@@ -67,16 +128,75 @@ class SoundMania:
         
         
     def request_map_play(self, map_path: str) -> None:
-        pass
+        """ Make a queued request of starting a map. 
         
+            The map chart is compiled only when its cached compiled form is missing or out of date, 
+            otherwise the compiled chart file is just memory-mapped. Maps without a playable chart
+            just play their song.
+        """
+        def request():
+            map_info = self.map_manager.get_map_info(map_path)
+            try:
+                chart = ChartCompiler.load(map_path)
+            except FileNotFoundError:
+                logger.info(f"Map '{map_path}' has no chart, playing its song only")
+                self.request_song_play(self.audio_cache.get(map_info, "full") or map_info.song_path)
+                return
+            except ChartSyntaxError as e:
+                logger.error(f"Could not load the chart of '{map_path}', playing its song only: {e}")
+                self.request_song_play(self.audio_cache.get(map_info, "full") or map_info.song_path)
+                return
+            
+            player: view.MapPlayerView = self.view_manager.get_view(view.MapPlayerView, self) # type: ignore
+            player.set_chart(chart)
+            player.start_recording(map_path)
+            self.view_manager.set_view(view.MapPlayerView, root=self)
+            self.request_song_play(self.audio_cache.get(map_info, "full") or map_info.song_path)
+            
+        self.request_queue.add(request)
         
-    def request_song_play(self, song_path: str) -> None:
+        
+    def request_song_play(self, song_path: str, start: int = 0) -> None:
+        """ Play a song from `start` miliseconds. """
         pygame.mixer.music.load(song_path)
-        pygame.mixer.music.play()
+        pygame.mixer.music.play(start=start / 1000)
+        self.song_clock.start()
+        if start:
+            self.song_clock.seek(start)
+        
+        
+    def request_song_preview(self, map_info: MapInfo) -> None:
+        """ Make a coalesced request of playing a song preview.
+        
+            The preview is started only once no other preview has been requested for `self.song_preview_delay`
+            miliseconds, so quickly scrolling through the maps doesn't start every song on the way. The preview
+            is played from the decoded audio cache when available, otherwise its clip is decoded in the background
+            for the next time.
+        """
+        def request():
+            self.request_song_play(*self.audio_cache.get_preview(map_info))
+            
+        self.request_queue.add_coalesced("song_preview", request, self.song_preview_delay)
         
         
     def request_sound_play(self, sound_name: str) -> None:
-        pygame.mixer.Sound(sound_name).play()
+        sound = self._sounds.get(sound_name)
+        if sound is None:
+            sound = self._sounds[sound_name] = pygame.mixer.Sound(sound_name)
+        sound.play()
+        
+        
+    def set_calibration_offsets(self, input_device: str, audio_offset: float, input_offset: float) -> None:
+        """ Apply and persist the calibrated latency offsets of the current audio device and a given input device.
+        
+            The audio offset is the audio output latency relative to the display latency, and the input offset
+            includes the display latency, as measured by the calibration view.
+        """
+        self.song_clock.latency = audio_offset
+        self.input_offsets[input_device] = input_offset
+        
+        self.config.set_calibration_offset("audio", self.audio_device, audio_offset)
+        self.config.set_calibration_offset("input", input_device, input_offset)
         
         
     def request_quit(self) -> None:
@@ -88,20 +208,39 @@ class SoundMania:
     
     
     def _mainloop(self) -> None:
+        """ Run the main loop until a quit is requested.
+        
+            The loop phases are marked for the frame profiler, which captures them once started with `PROFILER_HOTKEY`.
+        """
+        profiler = self.profiler
         while self.running:
             dt = self.clock.tick()
+            profiler.begin_frame(dt, type(self.view_manager.get_current_view()).__name__)
             
             event_list = self.input_manager.poll_events()
+            for event in event_list:
+                if event.type == pygame.KEYDOWN and event.key == self.PROFILER_HOTKEY:
+                    profiler.start()
             self.view_manager.handle_events(event_list)
+            profiler.mark("input")
             
             self.request_queue.process(dt)
+            profiler.mark("requests")
+            self.task_scheduler.process(dt)
+            self.map_manager.process(dt)
+            profiler.mark("tasks")
             self.input_manager.update(dt)
+            self.song_clock.update()
             self.view_manager.update(dt)
+            profiler.mark("update")
             
             self.view_manager.render(self.display_surface)
+            profiler.mark("render")
             
             pygame.display.flip()
             pygame.display.set_caption(f"SoundMania | FPS: {round(self.clock.get_fps())}")
+            profiler.mark("present")
+            profiler.end_frame()
             
         self._shutdown()
         
@@ -112,6 +251,18 @@ class SoundMania:
         return surface
         
         
+    def _show_first_frame(self) -> None:
+        self.display_surface.fill((26, 12, 12))
+        pygame.display.set_caption("SoundMania")
+        pygame.display.flip()
+        pygame.event.pump() # lets the window manager map the window right away
+        
+        
     def _shutdown(self) -> None:
+        from core.replay import ReplayWriter # cheap, already imported once a map has been played
+        ReplayWriter.close_all(timeout=self.REPLAY_CLOSE_TIMEOUT) # writer threads are daemons and would lose the replay tail
+        
+        self.task_scheduler.shutdown()
+        self.audio_cache.flush()
         pygame.quit()
         
\ No newline at end of file
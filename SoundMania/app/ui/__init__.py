@@ -1,3 +1,4 @@
 from ui.button import Button
 from ui.mapindex import MapIndex
 from ui.menuitemlist import MenuItemList
+from ui.notehighway import NoteHighway
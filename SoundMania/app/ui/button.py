@@ -5,6 +5,9 @@ from ui.core import UIComponent
 
 
 class Button(UIComponent):
+    __slots__ = ("is_mouse_pressed", "_was_mouse_pressed_on_enter", "is_mouse_over",
+                 "_on_mouse_pressed", "_on_mouse_click", "_on_mouse_over", "_on_mouse_down", "_on_mouse_up")
+    
     on_mouse_pressed = callback_property()
     on_mouse_click   = callback_property()
     on_mouse_over    = callback_property()
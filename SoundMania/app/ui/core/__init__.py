@@ -1,2 +1,3 @@
 from ui.core.basecomponent import UIComponent
-from ui.core.basecontainer import UIContainer
\ No newline at end of file
+from ui.core.basecontainer import UIContainer
+from ui.core.surfacecache import SurfaceCache
\ No newline at end of file
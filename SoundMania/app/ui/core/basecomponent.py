@@ -1,5 +1,4 @@
 from __future__ import annotations
-from functools import cached_property
 from typing import Iterable
 
 import pygame
@@ -10,10 +9,18 @@ from core.core import EvalAttrProxy
         
         
 class UIComponent:
-    """ Base class defining a renderable UI element. """
+    """ Base class defining a renderable UI element. 
+    
+        Components are slotted to keep large component trees compact. Subclasses which don't declare
+        their own `__slots__` get an instance dictionary as usual.
+    """
+    __slots__ = ("name", "_parent", "_hidden", "is_dirty", "_x", "_y", "_width", "_height", "surface", "_winpos_cache",
+                 "_is_centered", "_color", "_text", "_text_size", "_text_color", "_rendered_text_size")
+    
     def __init__(self, name: str, size_rect: _SizeRect | pygame.Rect, **kwargs):
         self.name = name
         self._parent: UIComponent | None = None
+        self._winpos_cache: tuple[float, float] | None = None
         
         self._hidden = False
         self.is_dirty = True # forces the surface to be redrawn on first render
@@ -28,6 +35,7 @@ class UIComponent:
         self._text = ''
         self._text_size = self._height
         self._text_color: _TupleI4 = (0,0,0,0)
+        self._rendered_text_size: int | None = None # resolved text size of the last text raster
 
         self.config(**kwargs)
         self.postinit()
@@ -259,8 +267,17 @@ class UIComponent:
             surface.blit(self.surface, self._winpos)
             
         
-    @cached_property
+    @property
     def _winpos(self) -> tuple[float, float]:
+        """ Position absolute to the screen, cached until `_winpos_recompute()` is called. """
+        winpos = self._winpos_cache
+        if winpos is None:
+            winpos = self._winpos_cache = self._calculate_winpos()
+            
+        return winpos
+    
+    
+    def _calculate_winpos(self) -> tuple[float, float]:
         x, y = self.position
         
         if self.centered:
@@ -272,10 +289,7 @@ class UIComponent:
     
     
     def _winpos_recompute(self) -> None:
-        try:
-            del self._winpos
-        except AttributeError:
-            pass
+        self._winpos_cache = None
         
         
     def _redraw_surface(self) -> None:
@@ -288,13 +302,18 @@ class UIComponent:
 
 
     def _redraw_text(self) -> None:
-        overlay = pygame.font.Font(None, int(self.text_size)).render(self.text, True, self.text_color)
+        self._rendered_text_size = text_size = int(self.text_size)
+        overlay = pygame.font.Font(None, text_size).render(self.text, True, self.text_color)
         self.surface.blit(overlay, (0,0))
         
         
     def _on_window_resize(self) -> None:
-        self.surface = pygame.surface.Surface(self.size)
-        self.is_dirty = True
+        width, height = self.size
+        if self.surface.get_size() != (int(width), int(height)): # relayout only when the resolved size has changed
+            self.surface = pygame.surface.Surface((width, height))
+            self.is_dirty = True
+        elif self._text and int(self.text_size) != self._rendered_text_size: # text sized in units relative to the window
+            self.is_dirty = True
         
         self._winpos_recompute()
         
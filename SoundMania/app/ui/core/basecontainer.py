@@ -8,6 +8,8 @@ from ui.core.basecomponent import UIComponent
 
 T = TypeVar('T', bound=UIComponent)
 class UIContainer(UIComponent, Generic[T]):
+    __slots__ = ("elements", )
+    
     def __init__(self, name: str, rect: _SizeRect | pygame.Rect, *elements: T, **kwargs):
         self.elements: dict[str, T] = {}
         super().__init__(name, rect, **kwargs)
@@ -81,10 +83,12 @@ class UIContainer(UIComponent, Generic[T]):
             
         
     def __getattr__(self, attr: str) -> T:
-        if not "elements" in dir(self):
-            raise KeyError(f"Container '{self.name}' is missing 'self.elements'")
+        try:
+            elements = object.__getattribute__(self, "elements") # bypasses __getattr__, which would recurse on a missing slot
+        except AttributeError:
+            raise KeyError(f"Container is missing 'self.elements', cannot look up '{attr}'") from None
         
-        element = self.elements.get(attr) 
+        element = elements.get(attr) 
         if element is None:
             raise AttributeError(f"container '{self.name}' does not contain element with name '{attr}'")
         
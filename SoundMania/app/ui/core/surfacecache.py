@@ -0,0 +1,46 @@
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+import pygame
+
+
+class SurfaceCache:
+    """ Bounded cache of pre-rendered surfaces, evicting the least recently used surface once full. """
+    MAX_SURFACES = 64
+
+    def __init__(self, max_surfaces: int = MAX_SURFACES):
+        if max_surfaces <= 0:
+            raise ValueError("Maximum number of cached surfaces must be greater than 0.")
+
+        self.max_surfaces = max_surfaces
+        self.hits = 0
+        self.misses = 0
+        self._surfaces: OrderedDict[Hashable, pygame.surface.Surface] = OrderedDict()
+
+
+    def get(self, key: Hashable, render: Callable[[], pygame.surface.Surface]) -> pygame.surface.Surface:
+        """ Return the cached surface for `key`, rendering and caching it with `render()` on a miss. """
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = self._surfaces[key] = render()
+        if len(self._surfaces) > self.max_surfaces:
+            self._surfaces.popitem(last=False)
+
+        return surface
+
+
+    def clear(self) -> None:
+        self._surfaces.clear()
+
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._surfaces
+
+
+    def __len__(self) -> int:
+        return len(self._surfaces)
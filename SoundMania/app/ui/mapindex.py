@@ -1,31 +1,68 @@
 from __future__ import annotations
+from collections import deque
 from typing import Callable
-from math import ceil
+from math import ceil, exp, floor
 
 import pygame
 
-from ui.core import UIComponent, UIContainer
+from ui.core import SurfaceCache, UIComponent, UIContainer
 from ui.core.type import _SizeRect
 from ui.core.units import pw, ph
 from ui.button import Button
+from core.mapmanager import MapInfo
+from core.requestqueue import RequestPriority
 import soundmania
 
 
 class MapIndex(UIContainer):
+    """ Smoothly scrolling list of map cards.
+    
+        The list keeps a continuous scroll position, easing towards the selected map every frame, and lays
+        the cards out relative to it. Card slots are recycled: a slot is bound to a new map only once its
+        previous map scrolls off-screen, so scrolling never touches the cards' contents.
+        
+        Map cards are rendered once into surfaces cached by map path, card size and style, and are drawn
+        with a single `Surface.blits` call. Cards about to scroll into view are pre-rendered, a few per frame.
+        
+        Song preview clips are prefetched only for the selected map and its direct neighbours, once the
+        selection settles, so scrolling through the list doesn't flood the task scheduler with decoding.
+    """
     BUTTON_OFFEST = 50
     BUTTON_HEIGHT = 150
+    CARD_COLOR = (200, 200, 200)
+    CARD_SHRINK = 20 # card width lost per map of distance from the selected map, in px
+    PRERENDER_PER_FRAME = 2
+    SCROLL_TIME = 60 # time constant of the scroll easing in ms
+    THUMBNAIL_HEADROOM = 16 # thumbnails kept in memory on top of the ones of the card slots and cached cards
     
     def __init__(self, root: soundmania.SoundMania, name: str, rect: _SizeRect | pygame.Rect, **kwargs):
         super().__init__(name, rect, **kwargs)
         self.root = root
         self._selected_index = 0
+        self._selected_path: str | None = None
+        self._previewed_song: str | None = None
+        self._library_version = -1
+        
+        self.card_cache = SurfaceCache()
+        self._card_template = self.get_card_template()
+        self._prerender_queue: deque[int] = deque() # indices of maps about to scroll into view
         
-        self._map_paths = self.root.map_manager.load_available_maps()
+        self._scroll_position = 0.0 # index of the map currently drawn at the center, fractional while scrolling
+        self._step_interval = float(self.SCROLL_TIME) # smoothed time in ms between selection steps, short during fast knob spins
+        self._since_step = 0.0
+        self._slot_maps: list[int | None] = [] # index of the map each card slot is bound to
+        self._slot_cards: list[pygame.surface.Surface | None] = []
+        self._slot_states: list[tuple[str, bool] | None] = [] # path and parsed state of the map each card slot was bound with
         
-        self._visible_count = self._calculate_visible_count() 
+        self._visible_count = self._calculate_visible_count()
         self._spawn_visible()
         
         
+    @property
+    def _map_paths(self) -> list[str]:
+        return self.root.map_manager.available_maps
+        
+        
     def get_prefab(self) -> UIContainer:
         """ Return a new GUI map object based on a prefab. """
         # container elements need to be instantiated separately to avoid shallow copying
@@ -35,106 +72,352 @@ class MapIndex(UIContainer):
                         UIComponent("section_author", (0, ph(60), pw(100), ph(40)), text="???", color=(200,200,200)),
                         parent=self, centered=True, color=(200,200,200)
                      )
-    
-        
+                     
+                     
+    def get_card_template(self) -> UIContainer:
+        """ Return a new detached map card, used to render the cached card surfaces. """
+        return UIContainer("map_card_template", (0, 0, 1, 1),
+                        UIComponent("section_title", (0, 0, pw(100), ph(60)), text="???", color=self.CARD_COLOR),
+                        UIComponent("section_author", (0, ph(60), pw(100), ph(40)), text="???", color=self.CARD_COLOR),
+                        color=self.CARD_COLOR
+                     )
+                     
+                     
     def select_previous(self, wrap: bool = True) -> None:
         """ Decrement the currenty selected map index.
-            
+        
             Args:
-                wrap: tells whether to wrap the index around or clamp to the last item 
+                wrap: tells whether to wrap the index around or clamp to the last item
         """
         if len(self) == 0:
             return
-        
+            
         idx = self._selected_index - 1
-        self._selected_index = idx % len(self) if wrap else max(idx, 0)
+        self._set_selected_index(idx % len(self) if wrap else max(idx, 0), -1)
         
-        self._update_visible()
         
-    
     def select_enter(self) -> None:
         """ Select and play current map. """
         if len(self) == 0:
             return
-        
-        selected = self._get_component_relative(0)
+            
+        selected = self._get_slot(self._selected_index)
         selected.button_overlay.on_mouse_click()
-    
-    
+        
+        
     def select_next(self, wrap: bool = True) -> None:
         """ Increment the currenty selected map index.
-            
+        
             Args:
-                wrap: tells whether to wrap the index around or clamp to the last item 
+                wrap: tells whether to wrap the index around or clamp to the last item
         """
         if len(self) == 0:
             return
-        
+            
         idx = self._selected_index + 1
-        self._selected_index = idx % len(self) if wrap else min(idx, len(self)-1)
+        self._set_selected_index(idx % len(self) if wrap else min(idx, len(self)-1), 1)
         
-        self._update_visible()
         
+    def update(self, dt: int) -> None:
+        version = self.root.map_manager.version
+        if version != self._library_version: # maps have been discovered or parsed by the background scan
+            self._library_version = version
+            self._follow_selected_map()
+            self._rebind_changed_slots()
+            if self._is_selection_stale():
+                self._on_selection_changed()
+            
+        for map_path in self.root.thumbnails.pop_arrivals(): # thumbnails have been made in the background
+            self._refresh_card(map_path)
+            
+        self._scroll(dt)
+        self._layout()
         
-    def _calculate_visible_count(self) -> int:
-        return ceil((self.height / (self.BUTTON_HEIGHT + self.BUTTON_OFFEST) - 1) / 2) * 2 + 1 # should always return an odd number
-    
-    
-    def _spawn_visible(self) -> None:
-        self.elements.clear()
+        for _ in range(min(self.PRERENDER_PER_FRAME, len(self._prerender_queue))):
+            map_index = self._prerender_queue.popleft()
+            if 0 <= map_index < len(self._map_paths):
+                self._get_card(self._map_paths[map_index])
+                
+        super().update(dt)
         
-        for i in range(-self._visible_count//2 + 1, self._visible_count//2 + 1):
-            component = self.get_prefab()
-            component.name = f"map_component_{i}"
-            self.add(component)
+        
+    def render(self, surface: pygame.surface.Surface) -> None:
+        """ Render the map index background and blit the visible map cards.
+        
+            Cards are clipped to their width, which shrinks with the distance from the selected map.
             
-        self._update_visible()
+            Args:
+                 surface: pygame `Surface` object on which to render
+        """
+        if self.hidden:
+            return
             
+        UIComponent.render(self, surface)
+        
+        blit_sequence = []
+        for slot, card in zip(self, self._slot_cards):
+            if card is not None and not slot.hidden:
+                blit_sequence.append((card, slot._winpos, (0, 0, slot.width, slot.height)))
+        surface.blits(blit_sequence, doreturn=False)
+        
+        
+    def _set_selected_index(self, index: int, direction: int) -> None:
+        if abs(index - self._scroll_position) > self._visible_count: # wrapped around, jump instead of scrolling through the whole list
+            self._scroll_position = index - direction
+            self._unbind_slots()
             
-    def _update_visible(self) -> None:
-        for i in range(-self._visible_count//2 + 1, self._visible_count//2 + 1):
-            component = self._get_component_relative(i)
-            component.is_dirty = True
+        self._step_interval += (min(self._since_step, self.SCROLL_TIME * 4) - self._step_interval) * 0.5
+        self._since_step = 0
             
-            map_index = self._selected_index + i
-            if  not 0 <= map_index < len(self._map_paths):
-                component.hidden = True
-                component.text = "???"
-                del component.button_overlay.on_mouse_click
-            else:
-                component.hidden = False
-                component.y = i *(self.BUTTON_HEIGHT + self.BUTTON_OFFEST) + self.y
-                component.width = self.width - abs(i) * 20
+        self._selected_index = index
+        self._on_selection_changed()
+        
+        
+    def _on_selection_changed(self) -> None:
+        paths = self._map_paths
+        if not 0 <= self._selected_index < len(paths):
+            return
+            
+        self._selected_path = paths[self._selected_index]
+        map_info = self.root.map_manager.peek_map_info(self._selected_path)
+        if map_info and map_info.song_path != self._previewed_song:
+            self._previewed_song = map_info.song_path
+            self.root.request_song_preview(map_info)
+            
+        self.root.request_queue.add_coalesced("clip_prefetch", self._prefetch_clips, self.root.song_preview_delay, priority=RequestPriority.LOW)
+        
+        # pre-render the cards which scroll into view once the list settles on the new selection
+        half = self._visible_count // 2
+        direction = 1 if self._selected_index >= self._scroll_position else -1
+        self._prerender_queue.clear()
+        for i in range(half, half + 2):
+            self._prerender_queue.append(self._selected_index + direction * i)
+            
+            
+    def _scroll(self, dt: int) -> None:
+        """ Ease the scroll position towards the selected map.
+        
+            The easing speeds up with the selection step rate, so the list keeps up with the knob spin velocity.
+        """
+        self._since_step += dt
+        distance = self._selected_index - self._scroll_position
+        if abs(distance) < 1e-3:
+            self._scroll_position = self._selected_index
+            return
+            
+        # during fast knob spins the list lags behind by at most half a screen, bounding the number of rebound slots per frame
+        max_lag = self._visible_count // 2
+        if abs(distance) > max_lag:
+            distance = max_lag if distance > 0 else -max_lag
+            
+        time_constant = min(self.SCROLL_TIME, self._step_interval / 2)
+        self._scroll_position = self._selected_index - distance * exp(-dt / max(time_constant, 1))
+        
+        
+    def _layout(self) -> None:
+        """ Bind the card slots to the maps in view and move them to their interpolated positions. """
+        half = self._visible_count // 2
+        first = max(floor(self._scroll_position) - half, 0)
+        last = min(ceil(self._scroll_position) + half, len(self._map_paths) - 1)
+        
+        in_view = [False] * len(self._slot_maps)
+        spacing = self.BUTTON_HEIGHT + self.BUTTON_OFFEST
+        for map_index in range(first, last + 1):
+            slot_index = map_index % len(self._slot_maps)
+            in_view[slot_index] = True
+            
+            if self._slot_maps[slot_index] != map_index:
+                self._bind_slot(slot_index, map_index)
                 
-                map_path = self._map_paths[map_index]
-                map_info = self.root.map_manager.get_map_info(map_path)
+            offset = map_index - self._scroll_position
+            slot = self[slot_index]
+            slot.y = offset * spacing + self.y
+            slot.width = self.width - abs(offset) * self.CARD_SHRINK
+            
+        for slot_index, visible in enumerate(in_view):
+            if not visible and self._slot_maps[slot_index] is not None:
+                self._bind_slot(slot_index, None)
                 
-                component.section_title.text = map_info.song_title
-                component.section_author.text = map_info.song_author
                 
-                component.button_overlay.on_mouse_click = self._get_button_callback(map_info.song_path)
+    def _bind_slot(self, slot_index: int, map_index: int | None) -> None:
+        slot = self[slot_index]
+        self._slot_maps[slot_index] = map_index
+        
+        if map_index is None:
+            slot.hidden = True
+            self._slot_cards[slot_index] = None
+            self._slot_states[slot_index] = None
+            del slot.button_overlay.on_mouse_click
+            return
+            
+        slot.hidden = False
+        map_path = self._map_paths[map_index]
+        self._slot_cards[slot_index] = self._get_card(map_path)
+        
+        map_info = self.root.map_manager.peek_map_info(map_path)
+        self._slot_states[slot_index] = (map_path, map_info is not None)
+        if map_info is None: # placeholder card, until the background scan parses the map
+            del slot.button_overlay.on_mouse_click
+        else:
+            slot.button_overlay.on_mouse_click = self._get_button_callback(map_info.map_path)
+            
+            
+    def _refresh_card(self, map_path: str) -> None:
+        """ Redraw the card of a map, if it's bound to a slot. """
+        paths = self._map_paths
+        for slot_index, map_index in enumerate(self._slot_maps):
+            if map_index is not None and map_index < len(paths) and paths[map_index] == map_path:
+                self._slot_cards[slot_index] = self._get_card(map_path)
+                
+                
+    def _rebind_changed_slots(self) -> None:
+        """ Rebind the slots whose map has been moved, dropped or parsed since the slot was bound. """
+        paths = self._map_paths
+        map_manager = self.root.map_manager
+        for slot_index, map_index in enumerate(self._slot_maps):
+            if map_index is None:
+                continue
                 
-                if i == 0:
-                    self.root.request_song_play(map_info.song_path)
+            if map_index >= len(paths):
+                self._bind_slot(slot_index, None)
+                continue
                 
-            component._on_window_resize()
+            map_path = paths[map_index]
+            if self._slot_states[slot_index] != (map_path, map_manager.peek_map_info(map_path) is not None):
+                self._bind_slot(slot_index, map_index)
+                
+                
+    def _is_selection_stale(self) -> bool:
+        """ Tell whether the selected map changed, or got parsed since it was selected, so its preview is yet to be requested. """
+        paths = self._map_paths
+        if not 0 <= self._selected_index < len(paths):
+            return False
             
+        map_path = paths[self._selected_index]
+        if map_path != self._selected_path:
+            return True
+            
+        map_info = self.root.map_manager.peek_map_info(map_path)
+        return map_info is not None and map_info.song_path != self._previewed_song
+        
+        
+    def _unbind_slots(self) -> None:
+        for slot_index in range(len(self._slot_maps)):
+            self._bind_slot(slot_index, None)
+        self.root.audio_cache.cancel_prefetches()
+        
+        
+    def _prefetch_clips(self) -> None:
+        """ Replace the queued clips with the previews of the settled selection and its direct neighbours,
+            followed by the fully decoded song of the selection, so playing it never waits on decoding.
+        """
+        audio_cache = self.root.audio_cache
+        audio_cache.cancel_prefetches()
+        
+        paths = self._map_paths
+        for i in (self._selected_index, self._selected_index + 1, self._selected_index - 1):
+            map_info = self.root.map_manager.peek_map_info(paths[i]) if 0 <= i < len(paths) else None
+            if map_info:
+                audio_cache.prefetch(map_info, "preview")
+        
+        selected_info = self.root.map_manager.peek_map_info(paths[self._selected_index]) if paths else None
+        if selected_info:
+            audio_cache.prefetch(selected_info, "full") # queued last, as it takes the longest to decode
             
-    def _get_button_callback(self, song_path: str) -> Callable:
-        return lambda _: self.root.request_song_play(song_path)
             
+    def _follow_selected_map(self) -> None:
+        """ Keep the selection on the same map when maps before it have been dropped from the library. """
+        paths = self._map_paths
+        if not paths:
+            self._selected_index = 0
+            self._scroll_position = 0
+            return
+            
+        if self._selected_index >= len(paths) or paths[self._selected_index] != self._selected_path:
+            try:
+                index = paths.index(self._selected_path) # type: ignore
+            except ValueError:
+                index = min(self._selected_index, len(paths) - 1)
+                
+            self._scroll_position += index - self._selected_index
+            self._selected_index = index
+            
+            
+    def _calculate_visible_count(self) -> int:
+        return ceil((self.height / (self.BUTTON_HEIGHT + self.BUTTON_OFFEST) - 1) / 2) * 2 + 1 # should always return an odd number
+        
+        
+    def _spawn_visible(self) -> None:
+        self.elements.clear()
+        
+        # two slots more than visible, for the maps partially scrolled into view on both ends
+        slot_count = self._visible_count + 2
+        for i in range(slot_count):
+            component = self.get_prefab()
+            component.name = f"map_component_{i}"
+            component.hidden = True
+            self.add(component)
+            
+        self._slot_maps = [None] * slot_count
+        self._slot_cards = [None] * slot_count
+        self._slot_states = [None] * slot_count
+        
+        # thumbnails of the slots and of every cached card stay in memory, so a cached card never falls back to a placeholder
+        self.root.thumbnails.max_surfaces = slot_count + self.card_cache.max_surfaces + self.THUMBNAIL_HEADROOM
+        self._layout()
+        
+        
+    def _get_slot(self, map_index: int) -> UIContainer:
+        return self[map_index % len(self._slot_maps)]
+        
+        
+    def _get_card(self, map_path: str) -> pygame.surface.Surface:
+        """ Return the cached full width card surface of a map, rendering the card on a cache miss. """
+        map_info = self.root.map_manager.peek_map_info(map_path)
+        thumbnail = self.root.thumbnails.get(map_path, self._get_thumbnail_size()) if map_info else None
+        size = int(self.width), int(self.BUTTON_HEIGHT)
+        key = (map_path if map_info else None, *size, self.CARD_COLOR, thumbnail is not None) # all placeholder cards look the same
+        
+        return self.card_cache.get(key, lambda: self._render_card(map_info, size, thumbnail))
     
-    def _on_window_resize(self) -> None:
-        super()._on_window_resize()
-        self._visible_count = self._calculate_visible_count() 
-        self._spawn_visible()
+    
+    def _get_thumbnail_size(self) -> tuple[int, int]:
+        return int(self.BUTTON_HEIGHT), int(self.BUTTON_HEIGHT)
+        
+        
+    def _render_card(self, map_info: MapInfo | None, size: tuple[int, int], thumbnail: pygame.surface.Surface | None = None) -> pygame.surface.Surface:
+        template = self._card_template
+        template.size = size
+        template._on_window_resize()
         
+        template.section_title.text = map_info.song_title if map_info else "Loading..."
+        template.section_author.text = map_info.song_author if map_info else ""
+        template.section_title.x = template.section_author.x = thumbnail.get_width() if thumbnail else 0
+        template.is_dirty = True
         
-    def _get_component_relative(self, index: int) -> UIContainer:
-        center = self._visible_count // 2
-        return super().__getitem__(center+index)
+        card = pygame.surface.Surface(size).convert()
+        template.render(card)
+        if thumbnail:
+            card.blit(thumbnail, (0, 0))
+        return card
         
         
+    def _get_button_callback(self, map_path: str) -> Callable:
+        return lambda _: self.root.request_map_play(map_path)
+        
+        
+    def _on_window_resize(self) -> None:
+        super()._on_window_resize()
+        
+        visible_count = self._calculate_visible_count()
+        if visible_count != self._visible_count:
+            self._visible_count = visible_count
+            self._spawn_visible()
+        else:
+            self._unbind_slots() # card surfaces are cached by width
+            self._layout()
+            
+            
     def __len__(self) -> int:
         return len(self._map_paths)
-    
\ No newline at end of file
+        
\ No newline at end of file
@@ -0,0 +1,118 @@
+from __future__ import annotations
+from bisect import bisect_left, bisect_right
+from typing import Sequence
+
+import pygame
+
+from ui.core import UIComponent
+
+
+class NoteHighway(UIComponent):
+    """ Gameplay component drawing the notes of a chart, scrolling towards a judgement line.
+
+        Notes are given as per-lane sorted arrays of timestamps in miliseconds. Each frame only
+        the visible window of every lane is located with a binary search, and the notes are drawn
+        with a single `Surface.blits` call from pre-rendered sprites.
+    """
+    LANE_COLORS = ((232, 232, 232), (216, 19, 51), (216, 19, 51), (232, 232, 232))
+    LINE_COLOR = (255, 255, 255)
+    NOTE_HEIGHT = 24
+    JUDGEMENT_LINE = 0.85 # relative position of the judgement line from the top edge
+
+    def postinit(self) -> None:
+        self.scroll_time = 800 # time in ms it takes for a note to travel from the top edge to the judgement line
+        self.song_position = 0.0
+        self.lane_cursors: Sequence[int] | None = None # per-lane indices of the first note to be drawn, used to hide judged notes
+
+        self._lanes: tuple[Sequence[float], ...] = ()
+        self._sprites: list[pygame.surface.Surface] = []
+
+
+    @property
+    def lane_count(self) -> int:
+        return len(self._lanes)
+
+
+    def set_lanes(self, lanes: Sequence[Sequence[float]]) -> None:
+        """ Set the chart notes to be drawn.
+
+            Args:
+                lanes: sequence of sorted note timestamp arrays, one per lane
+        """
+        self._lanes = tuple(lanes)
+        self._sprites = []
+        self.is_dirty = True
+
+
+    def get_visible_range(self, lane: int) -> tuple[int, int]:
+        """ Return the `[start, stop)` index range of notes of a given lane visible at the current song position. """
+        times = self._lanes[lane]
+        line_y = self.height * self.JUDGEMENT_LINE
+        ms_per_px = self.scroll_time / line_y
+
+        lo = self.lane_cursors[lane] if self.lane_cursors else 0
+        start = bisect_left(times, self.song_position - (self.height - line_y + self.NOTE_HEIGHT) * ms_per_px, lo=lo)
+        stop = bisect_right(times, self.song_position + (line_y + self.NOTE_HEIGHT) * ms_per_px, lo=start)
+        return start, stop
+
+
+    def render(self, surface: pygame.surface.Surface) -> None:
+        """ Draw the highway along with all currently visible notes.
+
+            Args:
+                surface: pygame `Surface` object on which to render
+        """
+        if self.hidden:
+            return
+
+        super().render(surface)
+        if not self._lanes:
+            return
+
+        if not self._sprites:
+            self._sprites = self._render_sprites()
+
+        x0, y0 = self._winpos
+        lane_w = self.width / self.lane_count
+        line_y = y0 + self.height * self.JUDGEMENT_LINE - self.NOTE_HEIGHT / 2
+        px_per_ms = self.height * self.JUDGEMENT_LINE / self.scroll_time
+        position = self.song_position
+
+        blit_sequence = []
+        for lane, times in enumerate(self._lanes):
+            start, stop = self.get_visible_range(lane)
+            if start == stop:
+                continue
+
+            sprite = self._sprites[lane]
+            x = x0 + lane * lane_w
+            blit_sequence += [(sprite, (x, line_y - (t - position) * px_per_ms)) for t in times[start:stop]]
+
+        surface.blits(blit_sequence, doreturn=False)
+
+
+    def _redraw_surface(self) -> None:
+        super()._redraw_surface()
+        self._sprites = [] # sprites depend on the component size
+
+        if self.lane_count:
+            lane_w = self.width / self.lane_count
+            for lane in range(1, self.lane_count):
+                pygame.draw.line(self.surface, self.LINE_COLOR, (lane * lane_w, 0), (lane * lane_w, self.height))
+
+        line_y = self.height * self.JUDGEMENT_LINE
+        pygame.draw.line(self.surface, self.LINE_COLOR, (0, line_y), (self.width, line_y), 3)
+
+
+    def _render_sprites(self) -> list[pygame.surface.Surface]:
+        lane_w = int(self.width / self.lane_count)
+
+        sprites = []
+        for lane in range(self.lane_count):
+            sprite = pygame.surface.Surface((lane_w, self.NOTE_HEIGHT), pygame.SRCALPHA)
+            color = self.LANE_COLORS[lane % len(self.LANE_COLORS)]
+            pygame.draw.rect(sprite, color, sprite.get_rect().inflate(-8, 0), border_radius=6)
+            sprites.append(sprite.convert_alpha() if pygame.display.get_surface() else sprite)
+
+        return sprites
+
@@ -1,4 +1,25 @@
 from view.baseview import View
-from view.mapindex import MapIndexView
-from view.mainmenu import MainMenuView
-from view.usersettings import UserSettingsView
\ No newline at end of file
+
+# views are imported lazily on first access, so their dependencies don't slow down the application startup
+_LAZY_VIEWS = {
+    "MapIndexView":     "view.mapindex",
+    "MapPlayerView":    "view.mapplayer",
+    "MainMenuView":     "view.mainmenu",
+    "UserSettingsView": "view.usersettings",
+    "CalibrationView":  "view.calibration",
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_VIEWS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module 'view' has no attribute '{name}'")
+    
+    from importlib import import_module
+    value = getattr(import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_LAZY_VIEWS])
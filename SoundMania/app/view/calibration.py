@@ -0,0 +1,163 @@
+from time import perf_counter
+
+import pygame
+
+from core.calibration import OffsetCalibrator, OffsetEstimate
+from core.input import SMEvent
+from ui.core import UIComponent
+import view
+
+
+class CalibrationView(view.View):
+    """ View measuring the audio output latency relative to the display, and the input latency.
+
+        The calibration runs in two phases. First the player taps along a click track played through the
+        sound effect path, which measures the audio and input latency combined. Then the player taps along
+        a flashing screen, which measures the display and input latency combined. Neither latency is measured
+        alone: the audio offset is the audio latency minus the display latency, which delays the song clock
+        so the notes are seen in time with the song, and the input offset is the input plus display latency,
+        which maps the taps onto that clock.
+
+        Beats are timestamped when their click is played or their flash is drawn, and taps when their event
+        is handled, so both share the main loop timing resolution.
+
+        While calibrating, every controller button is a tap, so turning a knob counter-clockwise
+        returns to the settings. Once done, the buttons confirm and return as usual, and turning a knob
+        clockwise retries.
+    """
+    CLICK_SOUND = "SoundMania\\src\\menu_tick.ogg"
+    BEAT_INTERVAL = 600
+    BEAT_COUNT = 16
+    LEAD_IN = 1500
+    FLASH_DURATION = 80
+
+    def __init__(self, root):
+        super().__init__(root)
+        self._phase = "idle"
+        self._last_beat = float("-inf")
+
+        # view layout
+        self.label = UIComponent("calibration_label", (0, "-10vh", "80vw", "6vh"), centered=True, color=(26, 12, 12), text_color=(255, 255, 255))
+        self.result_label = UIComponent("calibration_result", (0, "0vh", "80vw", "4vh"), centered=True, color=(26, 12, 12), text_color=(200, 200, 200))
+
+
+    def handle_input(self, event_list: list[pygame.event.Event]) -> None:
+        for event in event_list:
+            if event.type == pygame.QUIT:
+                self.root.request_quit()
+
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    self._exit()
+                elif event.key == pygame.K_RETURN and self._phase == "done":
+                    self._start()
+                else:
+                    self._tap(self._now(), "keyboard")
+
+            elif event.type == SMEvent.CON_BUTTON_DOWN:
+                self._tap(self._now(), "controller")
+
+            elif event.type == SMEvent.CON_KNOB_CCW:
+                self._exit()
+
+            elif event.type == SMEvent.CON_KNOB_CW and self._phase == "done":
+                self._start()
+
+
+    def prepare(self) -> None:
+        self.root.set_background_visibility(False)
+        self._start()
+
+
+    def update(self, dt: int) -> None:
+        if self._phase not in ("audio", "visual"):
+            return
+
+        now = self._now()
+        if self._beats_left and now >= self._next_beat:
+            self._calibrators[self._phase].add_beat(now) # the click is played, or the flash drawn, only now
+            if self._phase == "audio":
+                self.root.request_sound_play(self.CLICK_SOUND)
+
+            self._last_beat = now
+            self._next_beat += self.BEAT_INTERVAL
+            self._beats_left -= 1
+
+        elif not self._beats_left and now >= self._next_beat:
+            self._next_phase()
+
+
+    def render(self, surface: pygame.surface.Surface) -> None:
+        flash = self._phase == "visual" and 0 <= self._now() - self._last_beat < self.FLASH_DURATION
+        surface.fill((232, 232, 232) if flash else (26, 12, 12))
+
+        self.label.render(surface)
+        self.result_label.render(surface)
+
+
+    def on_window_resize(self) -> None:
+        self.label._on_window_resize()
+        self.result_label._on_window_resize()
+
+
+    def _start(self) -> None:
+        self.root.input_manager.controller_key_conversion = False # every controller button is a tap
+        self._calibrators = {"audio": OffsetCalibrator(), "visual": OffsetCalibrator()}
+        self._device = "keyboard"
+        self._phase = "idle"
+        self._next_phase()
+
+
+    def _next_phase(self) -> None:
+        if self._phase == "idle":
+            self._phase = "audio"
+            self.label.text = "Tap along with the clicks"
+        elif self._phase == "audio":
+            self._phase = "visual"
+            self.label.text = "Tap along with the flashes"
+        else:
+            self._phase = "done"
+            self.root.input_manager.controller_key_conversion = True # buttons confirm and return again
+            self._finish()
+            return
+
+        self.result_label.text = "Turn a knob left to return"
+        self._beats_left = self.BEAT_COUNT
+        self._next_beat = self._now() + self.LEAD_IN
+        self._last_beat = float("-inf")
+
+
+    def _finish(self) -> None:
+        total = self._calibrators["audio"].estimate()
+        visual = self._calibrators["visual"].estimate()
+        if not total or not visual:
+            self.label.text = "Not enough taps. Press ENTER to retry, ESC to return"
+            return
+
+        input_offset = visual.offset # input plus display latency
+        audio_offset = total.offset - visual.offset # audio latency relative to the display latency
+        self.root.set_calibration_offsets(self._device, audio_offset, input_offset)
+
+        self.label.text = f"A/V offset {audio_offset:+.1f}ms, {self._device} input + display offset {input_offset:+.1f}ms"
+        self.result_label.text = f"{self._describe(total)} | {self._describe(visual)} | ENTER to retry, ESC to return"
+
+
+    def _tap(self, now: float, device: str) -> None:
+        if self._phase in ("audio", "visual"):
+            self._device = device
+            self._calibrators[self._phase].add_tap(now)
+
+
+    def _exit(self) -> None:
+        self.root.input_manager.controller_key_conversion = True
+        self.root.request_view_change(view.UserSettingsView)
+
+
+    @staticmethod
+    def _describe(estimate: OffsetEstimate) -> str:
+        return f"{estimate.samples} taps, MAD {estimate.mad:.1f}ms, stdev {estimate.variance ** 0.5:.1f}ms, {estimate.rejected} rejected"
+
+
+    @staticmethod
+    def _now() -> float:
+        return perf_counter() * 1000
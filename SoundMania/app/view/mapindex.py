@@ -37,8 +37,12 @@ class MapIndexView(view.View):
                 elif event.key == pygame.K_ESCAPE:
                     self._button_return_callback()
                     
+                elif event.key == pygame.K_TAB:
+                    self.root.request_sound_play("SoundMania\\src\\menu_tick.ogg")
+                    self._cycle_map_ordering()
+                    
                 elif event.key == pygame.K_z:
-                     print(abs((pygame.mixer.music.get_pos() / (1000 / (140/60))) % 1 - 0.5) * 100)
+                     print(abs((self.root.song_clock.position / (1000 / (140/60))) % 1 - 0.5) * 100)
                      
             elif event.type == SMEvent.CON_KNOB_CW:
                 self.root.request_sound_play("SoundMania\\src\\menu_tick.ogg")
@@ -69,6 +73,17 @@ class MapIndexView(view.View):
         self.map_index._on_window_resize()
         
         
+    def _cycle_map_ordering(self) -> None:
+        """ Switch the map index to the next map ordering and remember it in the user settings. """
+        map_manager = self.root.map_manager
+        orderings = map_manager.ORDERINGS
+        ordering = orderings[(orderings.index(map_manager.ordering) + 1) % len(orderings)]
+        
+        map_manager.set_ordering(ordering)
+        self.root.config.settings_set(map_ordering=ordering)
+        self.root.config.settings_apply()
+        
+        
     def _button_return_callback(self, *args) -> None:
         self.root.request_sound_play("SoundMania\\src\\menu_select.ogg")
         self.root.request_view_change(view.MainMenuView)
@@ -1,31 +1,97 @@
 import pygame
 
+from core.chart import ChartData, CompiledChart
+from core.gameplay import GameplaySession
+from core.input import SMEvent
+from ui import NoteHighway
 from view.baseview import View
+import view
 
 
 class MapPlayerView(View):
+    LANE_KEYS = (pygame.K_d, pygame.K_f, pygame.K_j, pygame.K_k)
+    LANE_BUTTONS = ("OL", "IL", "IR", "OR")
+
     def __init__(self, root):
         super().__init__(root)
+        self.session: GameplaySession | None = None
 
         # view layout
-        
+        self.note_highway = NoteHighway("note_highway", (0, 0, "40vw", "100vh"), centered=True, color=(12, 12, 12))
+
+
+    def set_chart(self, chart: ChartData) -> None:
+        """ Set the chart to be played. """
+        self._end_session()
+
+        self.session = GameplaySession(chart, self.root.song_clock, input_offsets=self.root.input_offsets)
+        self.note_highway.set_lanes(chart.lanes)
+        self.note_highway.lane_cursors = self.session.judgement_engine.cursors
+
+
+    def start_recording(self, map_path: str) -> None:
+        """ Start recording the inputs and judgements of the current chart to a new replay file. """
+        if self.session:
+            self.session.start_recording(map_path)
+
 
     def handle_input(self, event_list: list[pygame.event.Event]) -> None:
         for event in event_list:
             if event.type == pygame.QUIT:
                 self.root.request_quit()
 
-            elif event.type == pygame.KEYDOWN:
-                pass
-                
-            
+            elif event.type in (pygame.KEYDOWN, pygame.KEYUP):
+                if event.key == pygame.K_ESCAPE and event.type == pygame.KEYDOWN:
+                    self._exit_map()
+
+                elif event.key in self.LANE_KEYS:
+                    self._lane_input(self.LANE_KEYS.index(event.key), event.type == pygame.KEYDOWN, "keyboard")
+
+            elif event.type in (SMEvent.CON_BUTTON_DOWN, SMEvent.CON_BUTTON_UP):
+                if event.button in self.LANE_BUTTONS:
+                    self._lane_input(self.LANE_BUTTONS.index(event.button), event.type == SMEvent.CON_BUTTON_DOWN, "controller")
+
+
+    def prepare(self) -> None:
+        self.root.set_background_visibility(False)
+        self.root.input_manager.controller_key_conversion = False # controller buttons are used as lanes
+
+
     def update(self, dt: int) -> None:
-        pass
-    
-    
+        if self.session:
+            self.note_highway.song_position = self.session.update()
+
+        self.note_highway.update(dt)
+
+
     def render(self, surface: pygame.surface.Surface) -> None:
         surface.fill((255, 0, 0))
-        
-        
+        self.note_highway.render(surface)
+
+
     def on_window_resize(self) -> None:
-        pass
\ No newline at end of file
+        self.note_highway._on_window_resize()
+
+
+    def _exit_map(self) -> None:
+        pygame.mixer.music.stop()
+        self.root.song_clock.stop()
+        self.root.input_manager.controller_key_conversion = True
+        self._end_session()
+        self.root.request_view_change(view.MapIndexView)
+
+
+    def _end_session(self) -> None:
+        if not self.session:
+            return
+
+        self.session.stop_recording()
+        if isinstance(self.session.chart, CompiledChart):
+            self.note_highway.set_lanes(())
+            self.session.chart.close()
+        self.session = None
+
+
+    def _lane_input(self, lane: int, pressed: bool, device: str) -> None:
+        if self.session:
+            self.session.lane_input(lane, pressed, device)
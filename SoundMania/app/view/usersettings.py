@@ -17,11 +17,19 @@ class UserSettingsView(view.View):
         button_return = pygment.component.Button("button_return", ("10pw", "90ph", "80pw", "10ph"))
         button_return.style = {"color": (8,8,8), "border_radius": 20, "border_color": (160,0,0)}
         button_return.add(pygment.component.Label("button_return_label", ("50pw", "50ph", "80pw", "80ph"), text="return", align_center=True, centered=True))
-        button_return.on_mouse_enter = lambda btn: self._button_return_enter_callback(btn)
+        button_return.on_mouse_enter = lambda btn: self._button_enter_callback(btn)
         button_return.on_mouse_leave = lambda btn: setattr(btn.style, "border_thickness", 0)
         button_return.on_mouse_click = self._button_return_callback
         button_return.join(settings)
         
+        button_calibrate = pygment.component.Button("button_calibrate", ("10pw", "78ph", "80pw", "10ph"))
+        button_calibrate.style = {"color": (8,8,8), "border_radius": 20, "border_color": (160,0,0)}
+        button_calibrate.add(pygment.component.Label("button_calibrate_label", ("50pw", "50ph", "80pw", "80ph"), text="calibrate", align_center=True, centered=True))
+        button_calibrate.on_mouse_enter = lambda btn: self._button_enter_callback(btn)
+        button_calibrate.on_mouse_leave = lambda btn: setattr(btn.style, "border_thickness", 0)
+        button_calibrate.on_mouse_click = self._button_calibrate_callback
+        button_calibrate.join(settings)
+        
         layout = (settings, )
         self.viewrenderer = pygment.ViewRenderer((0,0), layout)
 
@@ -35,6 +43,9 @@ class UserSettingsView(view.View):
                 if event.key == pygame.K_ESCAPE:
                     self._button_return_callback()
                     
+                elif event.key == pygame.K_c:
+                    self._button_calibrate_callback()
+                    
                     
     def prepare(self) -> None:
         self.root.set_background_visibility(True)
@@ -60,7 +71,15 @@ class UserSettingsView(view.View):
         self.root.request_transition_play("in", 150)
         
         
-    def _button_return_enter_callback(self, btn: pygment.component.Button) -> None:
+    def _button_calibrate_callback(self, *args) -> None:
+        self.root.request_sound_play("SoundMania\\src\\menu_select.ogg")
+        self.root.request_transition_play("out", 150)
+        self.root.request_view_change(view.CalibrationView)
+        self.root.request_transition_play("in", 150)
+        
+        
+    def _button_enter_callback(self, btn: pygment.component.Button) -> None:
+        """ Highlight the hovered button. """
         btn.style.border_thickness = 6
         self.root.request_sound_play("SoundMania\\src\\menu_tick.ogg")
     
\ No newline at end of file
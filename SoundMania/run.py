@@ -1,4 +1,4 @@
-from sys import path
+from sys import argv, path
 path.append("SoundMania/app")
 
 import logging
@@ -7,10 +7,14 @@ logging.basicConfig(level="INFO",
                     style='{', 
                     datefmt=f"%H:%M:%S")
 
+from core.startup import StartupTimeline
+timeline = StartupTimeline(trace_imports="--startup-timeline" in argv) # started before the heavy imports
+
 from app import SoundMania
+timeline.mark("imports")
 
 
 if __name__ == "__main__":
-    app = SoundMania()
+    app = SoundMania(timeline)
     app.run()
     
\ No newline at end of file
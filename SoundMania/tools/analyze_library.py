@@ -0,0 +1,38 @@
+""" Update the map library stats index, analyzing every new or changed map in a process pool.
+
+    Usage (from the repository root):
+        python SoundMania/tools/analyze_library.py [--map-dir DIR] [--workers N] [--no-audio]
+"""
+from argparse import ArgumentParser
+from sys import path
+from time import perf_counter
+path.append("SoundMania/app")
+
+from core.configio import ConfigIO
+from core.libraryanalyzer import LibraryAnalyzer
+from core.mapmanager import MapManager
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--map-dir", default=None, help="map library directory, defaults to the user map directory")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--no-audio", action="store_true", help="skip decoding the songs")
+    args = parser.parse_args()
+
+    map_manager = MapManager(args.map_dir or ConfigIO.get_user_map_directory())
+    analyzer = LibraryAnalyzer(map_manager)
+
+    start = perf_counter()
+    index = analyzer.analyze(args.workers, analyze_audio=not args.no_audio)
+    elapsed = perf_counter() - start
+
+    for map_path, stats in sorted(index.items(), key=lambda item: item[1].difficulty):
+        bpm = f"{stats.bpm_min:g}" if stats.bpm_min == stats.bpm_max else f"{stats.bpm_min:g}-{stats.bpm_max:g}"
+        print(f"{stats.difficulty:6.2f}  {stats.notes:6} notes  {stats.length/1000:6.1f}s  {stats.nps:5.2f} nps  "
+              f"peak {stats.peak_nps:5.1f} nps @{stats.peak_time/1000:.1f}s  {bpm} bpm  {map_path}")
+    print(f"{len(index)} maps indexed in {elapsed:.2f}s, index saved to '{analyzer.index_path}'")
+
+
+if __name__ == "__main__":
+    main()
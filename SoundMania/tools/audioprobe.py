@@ -0,0 +1,50 @@
+""" Probe the mixer with a range of buffer sizes and find the smallest one playing without underruns.
+
+    Usage (from the repository root):
+        python SoundMania/tools/audioprobe.py [--buffers 64 128 256 ...] [--duration MS] [--frame-load MS] [--save]
+"""
+from argparse import ArgumentParser
+from dataclasses import replace
+from sys import path
+path.append("SoundMania/app")
+
+import pygame
+
+from core.audioconfig import AudioConfig, AudioProbe
+from core.configio import ConfigIO
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buffers", type=int, nargs="+", default=[64, 128, 256, 512, 1024, 2048], help="buffer sizes in sample frames to probe")
+    parser.add_argument("--duration", type=int, default=3000, help="time in ms to probe each buffer size for")
+    parser.add_argument("--frame-load", type=float, default=0, help="busy time in ms simulated between samples, to probe under a loaded main loop")
+    parser.add_argument("--save", action="store_true", help="save the smallest stable buffer size to 'conf.ini'")
+    args = parser.parse_args()
+
+    config = ConfigIO()
+    base = AudioConfig.from_config(config)
+    probe = AudioProbe(args.duration, args.frame_load)
+    pygame.init()
+
+    print(f"{'buffer':>7} {'latency':>9} {'drift':>9} {'jitter':>8} {'underruns':>10}")
+    best = None
+    for buffer in sorted(args.buffers):
+        result = probe.run(replace(base, buffer=buffer))
+        print(f"{buffer:>7} {result.config.buffer_latency:>7.1f}ms {result.drift:>7.1f}ms {result.jitter:>6.1f}ms {result.underruns:>10} {'' if result.stable else 'UNSTABLE'}")
+        if result.stable and best is None:
+            best = result.config
+
+    pygame.quit()
+    if best is None:
+        print("No stable buffer size found")
+        return
+
+    print(f"Smallest stable buffer: {best.buffer} frames ({best.buffer_latency:.1f}ms)")
+    if args.save:
+        best.save(config)
+        print("Saved to 'conf.ini'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+""" Headless autoplay of every map in the library, for validating charts and profiling the gameplay update path.
+
+    Usage (from the repository root):
+        python SoundMania/tools/autoplay.py [--jitter MS] [map paths...]
+"""
+from argparse import ArgumentParser
+from sys import path
+from time import perf_counter
+path.append("SoundMania/app")
+
+from core.autoplay import AutoplaySimulator
+from core.chart import ChartCompiler, ChartSyntaxError
+from core.configio import ConfigIO
+from core.judgement import Judgement
+from core.mapmanager import MapManager
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("maps", nargs="*", help="map directories to play, defaults to the whole user library")
+    parser.add_argument("--jitter", type=float, default=0, help="standard deviation of the autoplay input offset in ms")
+    parser.add_argument("--frame-time", type=float, default=AutoplaySimulator.FRAME_TIME, help="simulated frame time in ms")
+    args = parser.parse_args()
+
+    map_paths = args.maps or MapManager(ConfigIO.get_user_map_directory()).load_available_maps()
+
+    failed = 0
+    start = perf_counter()
+    for map_path in map_paths:
+        try:
+            chart = ChartCompiler.load(map_path)
+        except (FileNotFoundError, ChartSyntaxError) as e:
+            print(f"FAIL {map_path}: {e}")
+            failed += 1
+            continue
+
+        report = AutoplaySimulator(chart, frame_time=args.frame_time, jitter=args.jitter).run()
+        chart.close()
+
+        counts = " ".join(f"{j.name.lower()}={report.counts[j]}" for j in Judgement)
+        print(f"OK   {map_path}: {report.notes} notes, simulated {report.simulated_time/1000:.1f}s in {report.wall_time:.1f}ms "
+              f"(x{report.speedup:,.0f}), update {report.update_time_mean*1000:.1f}us avg / {report.update_time_max*1000:.1f}us max, {counts}")
+
+    print(f"{len(map_paths)} maps, {failed} failed, {perf_counter() - start:.2f}s total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+""" Headless harness for the judgement engine.
+
+    Generates a synthetic chart along with a simulated player, feeds the inputs through
+    `JudgementEngine`, validates the results and reports the throughput.
+
+    Usage (from the repository root):
+        python SoundMania/tools/bench_judgement.py --notes 1000000
+"""
+from argparse import ArgumentParser
+from array import array
+from sys import path
+from time import perf_counter
+import random
+path.append("SoundMania/app")
+
+from core.judgement import Judgement, JudgementEngine, JudgementWindows
+
+
+def generate_chart(note_count: int, lane_count: int, hold_ratio: float, rng: random.Random) -> tuple[list[array], list[array]]:
+    """ Generate per-lane note and hold end arrays with notes at least 60ms apart within a lane. """
+    lanes = [array('d') for _ in range(lane_count)]
+    hold_ends = [array('d') for _ in range(lane_count)]
+    lane_time = [0.0] * lane_count
+
+    for _ in range(note_count):
+        lane = rng.randrange(lane_count)
+        start = lane_time[lane] + rng.uniform(60, 600)
+        end = start + rng.uniform(100, 400) if rng.random() < hold_ratio else start
+
+        lanes[lane].append(start)
+        hold_ends[lane].append(end)
+        lane_time[lane] = end + 60
+
+    return lanes, hold_ends
+
+
+def generate_inputs(lanes: list[array], hold_ends: list[array], jitter: float, miss_ratio: float, rng: random.Random) -> list[tuple[float, int, bool]]:
+    """ Generate a time-sorted list of `(time, lane, pressed)` inputs of a player hitting the chart. """
+    inputs = []
+    for lane, (times, ends) in enumerate(zip(lanes, hold_ends)):
+        for start, end in zip(times, ends):
+            if rng.random() < miss_ratio:
+                continue
+
+            press = start + rng.gauss(0, jitter)
+            release = max(end, start) + abs(rng.gauss(0, jitter)) + 1 if end > start else press + 40
+            inputs.append((press, lane, True))
+            inputs.append((release, lane, False))
+
+    inputs.sort()
+    return inputs
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=100_000)
+    parser.add_argument("--lanes", type=int, default=4)
+    parser.add_argument("--holds", type=float, default=0.1, help="ratio of hold notes")
+    parser.add_argument("--jitter", type=float, default=30, help="standard deviation of the player input offset in ms")
+    parser.add_argument("--misses", type=float, default=0.05, help="ratio of notes the player doesn't hit")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    lanes, hold_ends = generate_chart(args.notes, args.lanes, args.holds, rng)
+    inputs = generate_inputs(lanes, hold_ends, args.jitter, args.misses, rng)
+
+    engine = JudgementEngine(lanes, hold_ends, JudgementWindows(), keep_results=False)
+    judged = [bytearray(len(times)) for times in lanes]
+    tails = [bytearray(len(times)) for times in lanes]
+
+    def on_judgement(result):
+        seen = tails if result.release else judged
+        assert not seen[result.lane][result.note], f"note {result.lane}:{result.note} judged twice"
+        seen[result.lane][result.note] = 1
+
+    engine.on_judgement = on_judgement
+
+    start = perf_counter()
+    for time, lane, pressed in inputs:
+        engine.advance(time)
+        if pressed:
+            engine.press(lane, time)
+        else:
+            engine.release(lane, time)
+    engine.advance(float("inf"))
+    elapsed = perf_counter() - start
+
+    hold_count = sum(end > begin for times, ends in zip(lanes, hold_ends) for begin, end in zip(times, ends))
+    assert engine.finished, "engine did not judge every note"
+    assert all(all(lane) for lane in judged), "some notes were never judged"
+    assert sum(engine.counts.values()) == engine.note_count + hold_count, "judgement count mismatch"
+
+    print(f"notes: {engine.note_count} ({hold_count} holds), inputs: {len(inputs)}")
+    print(f"elapsed: {elapsed*1000:.1f}ms, {len(inputs) / elapsed:,.0f} inputs/s, {elapsed / len(inputs) * 1e6:.2f}us/input")
+    for judgement in Judgement:
+        print(f"  {judgement.name:<8} {engine.counts[judgement]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+""" Benchmark MapManager on synthetic map libraries of growing size.
+
+    Times the map discovery, parsing and ordering layers cold (on a fresh MapManager) and warm (repeated on
+    the same one), counting the file system calls made and the peak memory allocated. Libraries are generated
+    with `gen_library.py` on the first run and reused afterwards.
+
+    Cold runs only start without any MapManager caches. Pass --drop-caches (Linux, as root) to also drop the
+    OS page cache before them.
+
+    Usage (from the repository root):
+        python SoundMania/tools/bench_mapmanager.py [--sizes 1000 10000 100000] [--root DIR] [--drop-caches]
+"""
+from argparse import ArgumentParser
+from collections import Counter
+from dataclasses import dataclass
+from sys import path
+from time import perf_counter, sleep
+from typing import Any, Callable
+import builtins
+import os
+import tempfile
+import tracemalloc
+path.append("SoundMania/app")
+
+from gen_library import generate_library
+from core.libraryanalyzer import MapStats
+from core.mapmanager import MapManager
+from core.taskscheduler import TaskScheduler
+
+import logging
+logging.disable(logging.WARNING) # broken maps are expected
+
+
+class SyscallCounter:
+    """ Context manager counting the file system calls made through `os` and `open`, from any thread.
+
+        `os.path.isdir()`, `os.path.isfile()` and friends are counted as the `stat` calls they make.
+    """
+    FUNCTIONS = ("stat", "lstat", "listdir", "scandir")
+
+    def __init__(self):
+        self.counts: Counter[str] = Counter()
+        self._originals: dict[str, Callable] = {}
+
+
+    def __enter__(self) -> "SyscallCounter":
+        for name in self.FUNCTIONS:
+            self._originals[name] = getattr(os, name)
+            setattr(os, name, self._wrap(name, self._originals[name]))
+        self._originals["open"] = builtins.open
+        builtins.open = self._wrap("open", builtins.open)
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        builtins.open = self._originals.pop("open")
+        for name, function in self._originals.items():
+            setattr(os, name, function)
+        self._originals.clear()
+
+
+    def _wrap(self, name: str, function: Callable) -> Callable:
+        def counted(*args, **kwargs):
+            self.counts[name] += 1
+            return function(*args, **kwargs)
+        return counted
+
+
+@dataclass
+class BenchResult:
+    size: int
+    name: str
+    state: str
+    time: float         # wall time in ms
+    syscalls: Counter
+    peak_memory: int    # peak traced memory in bytes
+
+
+def measure(size: int, name: str, state: str, setup: Callable[[], Any], run: Callable[[Any], Any]) -> BenchResult:
+    """ Time `run(setup())`, then repeat it on a new setup counting the system calls and tracing the memory.
+
+        The runs are separate, as the tracing slows the run down considerably.
+    """
+    subject = setup()
+    start = perf_counter()
+    run(subject)
+    elapsed = (perf_counter() - start) * 1000
+
+    subject = setup()
+    tracemalloc.start()
+    with SyscallCounter() as counter:
+        run(subject)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return BenchResult(size, name, state, elapsed, counter.counts, peak)
+
+
+def drop_caches() -> None:
+    os.sync()
+    with open("/proc/sys/vm/drop_caches", "w") as file:
+        file.write("3\n")
+
+
+def run_scan(map_manager: MapManager) -> float:
+    """ Scan the library in the background, driving the scheduler and the manager like the main loop does.
+
+        Returns:
+            the longest `process()` call in ms, the frame hitch the scan would cause
+    """
+    task_scheduler = TaskScheduler()
+    map_manager.scan(task_scheduler)
+    longest = 0.0
+    while map_manager.scanning or task_scheduler.in_flight:
+        start = perf_counter()
+        task_scheduler.process(16)
+        map_manager.process(16)
+        longest = max(longest, (perf_counter() - start) * 1000)
+        sleep(0.001)
+
+    task_scheduler.shutdown()
+    return longest
+
+
+def synthetic_stats(map_paths: list[str]) -> dict[str, MapStats]:
+    """ Make stats for the length and difficulty orderings, deterministic per map. """
+    stats = {}
+    for i, map_path in enumerate(map_paths):
+        nps = (i * 7919 % 1000) / 100
+        stats[map_path] = MapStats("", int(nps * 120), 120_000, 120_000 + i % 60_000, nps, nps * 2, 0, 120, 120)
+    return stats
+
+
+def bench_library(library: str, size: int, drop: bool) -> list[BenchResult]:
+    results = []
+
+    def cold() -> MapManager:
+        if drop:
+            drop_caches()
+        return MapManager(library)
+
+    def warm() -> MapManager:
+        map_manager = MapManager(library)
+        map_manager.load_available_maps()
+        return map_manager
+
+    results.append(measure(size, "load_available_maps", "cold", cold, lambda mm: mm.load_available_maps()))
+    results.append(measure(size, "load_available_maps", "warm", warm, lambda mm: mm.load_available_maps()))
+
+    map_paths = warm().available_maps
+    results.append(measure(size, "get_map_info (each map)", "cold", cold, lambda mm: [mm.get_map_info(p) for p in map_paths]))
+    results.append(measure(size, "get_map_info (each map)", "warm", warm, lambda mm: [mm.get_map_info(p) for p in map_paths]))
+
+    hitches = []
+    results.append(measure(size, "scan", "cold", cold, lambda mm: hitches.append(run_scan(mm))))
+    results[-1].name += f" (worst process() {max(hitches):.1f}ms)"
+
+    stats = synthetic_stats(map_paths)
+    few = dict(list(stats.items())[:16])
+    results.append(measure(size, "set_map_stats (all maps)", "warm", warm, lambda mm: mm.set_map_stats(stats)))
+    results.append(measure(size, "set_map_stats (16 maps)", "warm", warm, lambda mm: mm.set_map_stats(few)))
+    results.append(measure(size, "set_ordering (all orderings)", "warm", warm, lambda mm: [mm.set_ordering(o) for o in MapManager.ORDERINGS]))
+    return results
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000], help="library sizes in maps")
+    parser.add_argument("--root", default=os.path.join(tempfile.gettempdir(), "soundmania_libraries"), help="directory to keep the generated libraries in")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--drop-caches", action="store_true", help="drop the OS page cache before cold runs (Linux, root only)")
+    args = parser.parse_args()
+
+    print(f"{'maps':>7} | {'benchmark':<42} | {'state':<5} | {'time':>10} | {'peak memory':>11} | syscalls")
+    for size in args.sizes:
+        library = os.path.join(args.root, f"library_{size}_{args.seed}")
+        start = perf_counter()
+        generate_library(library, size, args.seed)
+        print(f"{size:>7} | library '{library}' ready in {perf_counter() - start:.1f}s")
+
+        for result in bench_library(library, size, args.drop_caches):
+            syscalls = ", ".join(f"{name} {count}" for name, count in sorted(result.syscalls.items()))
+            print(f"{result.size:>7} | {result.name:<42} | {result.state:<5} | {result.time:>8.1f}ms | "
+                  f"{result.peak_memory / 1024:>8.0f}KiB | {sum(result.syscalls.values())} ({syscalls})")
+
+
+if __name__ == "__main__":
+    main()
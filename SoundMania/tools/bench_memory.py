@@ -0,0 +1,108 @@
+""" Measure the memory taken by a single instance of the UI components and the core records, using `tracemalloc`.
+
+    Only memory allocated through Python is traced, so the pixel data of component surfaces, allocated by SDL,
+    isn't included. Results can be saved as JSON tagged with the current git commit and compared with a previous run.
+
+    Usage (from the repository root):
+        python SoundMania/tools/bench_memory.py [--count N] [--output FILE] [--compare FILE]
+"""
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from sys import path
+from typing import Any, Callable
+import gc
+import json
+import platform
+import tracemalloc
+path.append("SoundMania/app")
+
+from bench_ui import WINDOW_SIZE, git_revision
+import pygame
+
+from core.judgement import Judgement, JudgementResult
+from core.libraryanalyzer import MapStats
+from core.mapmanager import MapInfo
+from core.replay import ReplayInput
+from core.requestqueue import _RequestItem
+from ui.core import UIComponent, UIContainer
+from ui.button import Button
+
+
+def _no_op() -> None:
+    pass
+
+
+# type name -> factory of a single instance. Arguments are shared, so only the instance itself is measured
+FACTORIES: dict[str, Callable[[], Any]] = {
+    "UIComponent": lambda: UIComponent("component", (0, 0, 1, 1)),
+    "UIComponent (units, text)": lambda: UIComponent("component", (0, 0, "1pw", "1ph"), text="label", color=(200, 200, 200)),
+    "UIContainer (empty)": lambda: UIContainer("container", (0, 0, 1, 1)),
+    "Button": lambda: Button("button", (0, 0, 1, 1)),
+    "Button (with callback)": lambda: Button("button", (0, 0, 1, 1), on_mouse_click=_no_op),
+    "MapInfo": lambda: MapInfo("map_path", "song_author", "song_title", "song_path", 0, 0.0),
+    "MapStats": lambda: MapStats("signature", 1000, 120000.0, 120000.0, 8.3, 12.0, 60000.0, 120.0, 180.0),
+    "_RequestItem": lambda: _RequestItem(_no_op, 0),
+    "JudgementResult": lambda: JudgementResult(0, 0, 1000.0, 12.5, Judgement.GREAT),
+    "ReplayInput": lambda: ReplayInput(1000.0, 0, True),
+}
+
+
+def measure(factory: Callable[[], Any], count: int) -> float:
+    """ Return the average number of bytes allocated by `factory` per instance kept alive. """
+    instances: list[Any] = [None] * count
+    factory() # warm up the caches filled on first use
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for i in range(count):
+        instances[i] = factory()
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return (after - before) / count
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10_000, help="number of instances of each type to allocate")
+    parser.add_argument("--output", default=None, help="JSON file to save the results to")
+    parser.add_argument("--compare", default=None, help="JSON file of a previous run to compare the results with")
+    args = parser.parse_args()
+
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode(WINDOW_SIZE)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r") as file:
+            previous = json.load(file)
+        baseline = previous["results"]
+        print(f"comparing with {previous['revision']} from {previous['date']}")
+
+    print(f"{'type':<28} {'bytes/instance':>14} {'before':>8} {'change':>8}")
+    results = {}
+    for name, factory in FACTORIES.items():
+        size = results[name] = measure(factory, args.count)
+        before = f"{baseline[name]:>8.0f}" if name in baseline else ""
+        change = f"{(size / baseline[name] - 1) * 100:+7.1f}%" if name in baseline else ""
+        print(f"{name:<28} {size:>14.0f} {before:>8} {change:>8}")
+
+    pygame.quit()
+    if args.output:
+        report = {
+            "revision": git_revision(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "count": args.count,
+            "results": results,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"results saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
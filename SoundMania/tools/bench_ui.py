@@ -0,0 +1,255 @@
+""" Microbenchmarks of the UI core: component creation, property access, layout cascades and rendering.
+
+    Runs headless with the dummy SDL video driver. Every benchmark is timed with `timeit`, taking the best
+    and the median of several repeats. Results can be saved as JSON tagged with the current git commit,
+    and compared with a previous run to see the effect of a change.
+
+    Usage (from the repository root):
+        python SoundMania/tools/bench_ui.py [--filter TEXT] [--repeat N] [--output FILE] [--compare FILE]
+"""
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from statistics import median
+from sys import path
+from timeit import Timer
+from typing import Callable
+import json
+import os
+import platform
+import subprocess
+path.append("SoundMania/app")
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+
+from ui.core import UIComponent, UIContainer
+from ui.button import Button
+
+
+WINDOW_SIZE = (1600, 900)
+TREE_DEPTH = 4
+TREE_FANOUT = 4
+CHAIN_DEPTH = 8
+
+# benchmark name -> setup function, returning the operation to be timed
+BENCHMARKS: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str) -> Callable:
+    """ Register a benchmark. The decorated function sets it up, outside of the timing, and returns the operation to time. """
+    def register(setup: Callable[[], Callable[[], object]]) -> Callable[[], Callable[[], object]]:
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def make_tree(depth: int = TREE_DEPTH, fanout: int = TREE_FANOUT, name: str = "root") -> UIContainer:
+    """ Make a container tree with `fanout` children per container, sized in units relative to the parents. """
+    if depth == 1:
+        return UIContainer(name, (0, 0, "100vw", "100vh"),
+                        *[UIComponent(f"leaf_{i}", (f"{i}pw", f"{i}ph", "50pw", "50ph"), color=(i, i, i)) for i in range(fanout)])
+
+    children = [make_tree(depth - 1, fanout, f"node_{i}") for i in range(fanout)]
+    for i, child in enumerate(children):
+        child.config(x=f"{i}pw", y=f"{i}ph", width="50pw", height="50ph", color=(i, i, i))
+    return UIContainer(name, (0, 0, "100vw", "100vh"), *children)
+
+
+def make_chain(depth: int = CHAIN_DEPTH) -> tuple[UIContainer, UIComponent]:
+    """ Make a chain of nested centered containers, each 90% the size of its parent. Returns the root and the leaf. """
+    leaf = UIComponent("leaf", ("1pw", "1ph", "90pw", "90ph"), centered=True)
+    node: UIComponent = leaf
+    for i in range(depth):
+        node = UIContainer(f"node_{i}", ("1pw", "1ph", "90pw", "90ph") if i < depth - 1 else (0, 0, "100vw", "100vh"), node, centered=True)
+    return node, leaf # type: ignore
+
+
+def tree_size(component: UIComponent) -> int:
+    return 1 + sum(tree_size(child) for child in component) if isinstance(component, UIContainer) else 1
+
+
+@benchmark("component.create")
+def bench_component_create():
+    return lambda: UIComponent("component", (0, 0, "50pw", "10ph"), text="label", color=(200, 200, 200))
+
+
+@benchmark("container.create_tree")
+def bench_container_create_tree():
+    return make_tree
+
+
+@benchmark("button.create")
+def bench_button_create():
+    return lambda: Button("button", (0, 0, "50pw", "10ph"), text="button", hidden=True)
+
+
+@benchmark("property.x_plain")
+def bench_property_x_plain():
+    component = UIComponent("component", (10, 10, 100, 100))
+    return lambda: component.x
+
+
+@benchmark("property.width_unit")
+def bench_property_width_unit():
+    component = UIComponent("component", (0, 0, "50vw", "10vh"))
+    return lambda: component.width
+
+
+@benchmark("property.width_unit_chain")
+def bench_property_width_unit_chain():
+    _, leaf = make_chain()
+    return lambda: leaf.width
+
+
+@benchmark("property.size_tree")
+def bench_property_size_tree():
+    components = list(_walk(make_tree()))
+    return lambda: [component.size for component in components]
+
+
+@benchmark("winpos.cached")
+def bench_winpos_cached():
+    _, leaf = make_chain()
+    leaf._winpos
+    return lambda: leaf._winpos
+
+
+@benchmark("winpos.recompute_chain")
+def bench_winpos_recompute_chain():
+    root, leaf = make_chain()
+    def op():
+        root._winpos_recompute()
+        return leaf._winpos
+    return op
+
+
+@benchmark("layout.move_root")
+def bench_layout_move_root():
+    root = make_tree()
+    leaves = [component for component in _walk(root) if not isinstance(component, UIContainer)]
+    def op():
+        root.x = root._x
+        return [leaf._winpos for leaf in leaves]
+    return op
+
+
+@benchmark("layout.resize_cascade")
+def bench_layout_resize_cascade():
+    root = make_tree()
+    return root._on_window_resize
+
+
+@benchmark("container.getitem")
+def bench_container_getitem():
+    container = UIContainer("container", (0, 0, 100, 100), *[UIComponent(f"element_{i}", (0, 0, 10, 10)) for i in range(32)])
+    return lambda: container[16]
+
+
+@benchmark("container.getattr")
+def bench_container_getattr():
+    container = UIContainer("container", (0, 0, 100, 100), *[UIComponent(f"element_{i}", (0, 0, 10, 10)) for i in range(32)])
+    return lambda: container.element_16
+
+
+@benchmark("component.get_rect")
+def bench_component_get_rect():
+    _, leaf = make_chain()
+    return leaf.get_rect
+
+
+@benchmark("button.update")
+def bench_button_update():
+    button = Button("button", (0, 0, "50pw", "10ph"))
+    return lambda: button.update(16)
+
+
+@benchmark("render.clean_tree")
+def bench_render_clean_tree():
+    root = make_tree()
+    surface = pygame.display.get_surface()
+    root.render(surface)
+    return lambda: root.render(surface)
+
+
+@benchmark("render.dirty_text")
+def bench_render_dirty_text():
+    component = UIComponent("component", (0, 0, "50vw", "10vh"), text="Exit This Earth's Atmosphere", color=(200, 200, 200))
+    surface = pygame.display.get_surface()
+    def op():
+        component.is_dirty = True
+        component.render(surface)
+    return op
+
+
+def _walk(component: UIComponent):
+    yield component
+    if isinstance(component, UIContainer):
+        for child in component:
+            yield from _walk(child)
+
+
+def run(name: str, repeat: int) -> dict[str, float | int]:
+    """ Time a benchmark. Times are given in microseconds per operation. """
+    timer = Timer(BENCHMARKS[name]())
+    number, _ = timer.autorange()
+    times = [time / number * 1e6 for time in timer.repeat(repeat, number)]
+    return {"min": min(times), "median": median(times), "number": number, "repeat": repeat}
+
+
+def git_revision() -> str | None:
+    """ Return the current commit hash, marked with '+dirty' when the working tree has uncommitted changes. """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return commit + ("+dirty" if status.strip() else "")
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="run only the benchmarks with names containing this text")
+    parser.add_argument("--repeat", type=int, default=7, help="number of timed repeats per benchmark")
+    parser.add_argument("--output", default=None, help="JSON file to save the results to")
+    parser.add_argument("--compare", default=None, help="JSON file of a previous run to compare the results with")
+    args = parser.parse_args()
+
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode(WINDOW_SIZE)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r") as file:
+            previous = json.load(file)
+        baseline = previous["results"]
+        print(f"comparing with {previous['revision']} from {previous['date']}")
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    print(f"tree: depth {TREE_DEPTH}, fanout {TREE_FANOUT} ({tree_size(make_tree())} components), chain: depth {CHAIN_DEPTH}")
+    print(f"{'benchmark':<28} {'min':>12} {'median':>12} {'change':>8}")
+
+    results = {}
+    for name in names:
+        result = results[name] = run(name, args.repeat)
+        change = f"{(result['min'] / baseline[name]['min'] - 1) * 100:+7.1f}%" if name in baseline else ""
+        print(f"{name:<28} {result['min']:>10.2f}us {result['median']:>10.2f}us {change:>8}")
+
+    pygame.quit()
+    if args.output:
+        report = {
+            "revision": git_revision(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "machine": f"{platform.system()} {platform.machine()} {platform.processor()}".strip(),
+            "results": results,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"results saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
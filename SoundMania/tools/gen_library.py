@@ -0,0 +1,118 @@
+""" Generate a synthetic map library of arbitrary size, mixing valid maps with the usual kinds of broken ones.
+
+    Songs are empty files, so the library exercises only the map discovery and parsing, not the audio decoding.
+
+    Usage (from the repository root):
+        python SoundMania/tools/gen_library.py DIR [--maps N] [--seed S] [--valid-only]
+"""
+from argparse import ArgumentParser
+from collections import Counter
+from sys import path
+from time import perf_counter
+import json
+import os
+import random
+path.append("SoundMania/app")
+
+from core.mapmanager import MapManager
+
+
+# kinds of generated map directories, with their default share of the library
+MAP_KINDS = {
+    "valid": 0.86,
+    "empty_info": 0.02,     # valid, author and title default to "???"
+    "bad_offset": 0.02,     # valid, the preview offset isn't a number
+    "missing_info": 0.03,
+    "missing_audio": 0.03,
+    "multiple_audio": 0.02,
+    "stray_file": 0.01,     # a file named like a map
+    "foreign_dir": 0.01,    # a directory without the map extension
+}
+VALID_KINDS = ("valid", "empty_info", "bad_offset")
+MARKER_FILE_NAME = "library.json"
+
+_WORDS = ("night", "moon", "fire", "flames", "apple", "atmosphere", "earth", "drum", "anima", "fool", "Éclair", "Ñandú",
+          "über", "café", "straße", "déjà", "vu", "zeta", "alpha", "Ωmega", "星", "夜", "rhythm", "bass", "pulse", "echo")
+
+
+def generate_library(directory: str, count: int, seed: int = 0, kinds: dict[str, float] | None = None) -> Counter:
+    """ Generate a library of `count` maps in `directory`, drawing the kind of every map from `kinds`.
+
+        A marker file describing the library is written last, and a directory already holding a library
+        generated with the same parameters is reused as it is.
+
+        Returns:
+            number of generated maps of each kind
+    """
+    kinds = kinds or MAP_KINDS
+    marker = {"maps": count, "seed": seed, "kinds": kinds}
+    marker_path = os.path.join(directory, MARKER_FILE_NAME)
+    try:
+        with open(marker_path, "r") as file:
+            existing = json.load(file)
+        if {name: existing.get(name) for name in marker} == marker:
+            return Counter(existing["generated"])
+    except (FileNotFoundError, ValueError):
+        pass
+
+    if os.path.isdir(directory) and os.listdir(directory):
+        raise FileExistsError(f"'{directory}' is not empty and does not hold a library generated with the same parameters")
+
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    names, weights = list(kinds), list(kinds.values())
+    generated: Counter[str] = Counter()
+    for i in range(count):
+        kind = rng.choices(names, weights)[0]
+        _generate_map(os.path.join(directory, f"map_{i:06}"), kind, rng)
+        generated[kind] += 1
+
+    marker["generated"] = generated
+    with open(marker_path, "w") as file:
+        json.dump(marker, file)
+
+    return generated
+
+
+def _generate_map(base_path: str, kind: str, rng: random.Random) -> None:
+    if kind == "stray_file":
+        open(base_path + MapManager.MAP_EXTENSION, "w").close()
+        return
+
+    map_path = base_path if kind == "foreign_dir" else base_path + MapManager.MAP_EXTENSION
+    os.mkdir(map_path)
+
+    if kind != "missing_info":
+        author = " ".join(rng.choices(_WORDS, k=rng.randint(1, 2))).title()
+        title = " ".join(rng.choices(_WORDS, k=rng.randint(1, 4))).capitalize()
+        offset = "soon" if kind == "bad_offset" else str(rng.randrange(0, 120_000, 250))
+        with open(os.path.join(map_path, MapManager.INFO_FILE_NAME), "w", encoding="utf-8") as file:
+            file.write("\n\n\n" if kind == "empty_info" else f"{author}\n{title}\n{offset}\n")
+
+    if kind != "missing_audio":
+        open(os.path.join(map_path, "song.mp3"), "w").close()
+    if kind == "multiple_audio":
+        open(os.path.join(map_path, "song.ogg"), "w").close()
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", help="directory to generate the library in, must be empty or missing")
+    parser.add_argument("--maps", type=int, default=1000, help="number of map directories to generate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--valid-only", action="store_true", help="generate only valid maps")
+    args = parser.parse_args()
+
+    kinds = {kind: MAP_KINDS[kind] for kind in VALID_KINDS} if args.valid_only else MAP_KINDS
+
+    start = perf_counter()
+    generated = generate_library(args.directory, args.maps, args.seed, kinds)
+    elapsed = perf_counter() - start
+
+    for kind, count in generated.most_common():
+        print(f"  {kind:<16} {count}")
+    print(f"{sum(generated.values())} maps generated in '{args.directory}' in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()